@@ -53,14 +53,76 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ProfilerMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.PathScopedMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.RequestTimingMiddleware",
+    "core.middleware.SlowQueryMiddleware",
+    "core.middleware.AllocationTrackingMiddleware",
+]
+
+# Middleware for the admin, run by PathScopedMiddleware for every path but
+# BROWSER_MIDDLEWARE_EXEMPT_PATHS: the API authenticates with tokens and
+# never uses sessions, CSRF cookies or messages.
+BROWSER_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+BROWSER_MIDDLEWARE_EXEMPT_PATHS = ["/api/"]
+
+# The admin and the CSRF deploy check look for this middleware in MIDDLEWARE,
+# it is in BROWSER_MIDDLEWARE.
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410", "security.W003"]
+
+# Server-Timing header and a structured log line per request.
+REQUEST_TIMING = bool(int(os.environ.get("REQUEST_TIMING", 0)))
+
+# Directory for the per-process metrics files served on /api/metrics/.
+# Empty disables metrics collection.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+# Bearer token the scraper must send to /api/metrics/. Without one the
+# endpoint refuses every request, wherever it comes from.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Queries slower than SLOW_QUERY_THRESHOLD_MS are logged with their plan to
+# SLOW_QUERY_LOG_FILE; 0 disables the slow-query log. A SLOW_QUERY_SAMPLE_RATE
+# share of them is logged, at most SLOW_QUERY_MAX_PER_MINUTE per process.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 0))
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get("SLOW_QUERY_SAMPLE_RATE", 1.0))
+SLOW_QUERY_MAX_PER_MINUTE = int(os.environ.get("SLOW_QUERY_MAX_PER_MINUTE", 30))
+SLOW_QUERY_LOG_FILE = os.environ.get("SLOW_QUERY_LOG_FILE", "/tmp/slow_queries.log")
+
+# Requests are profiled when a staff user sends "X-Profile: 1" or, at
+# PROFILER_SAMPLE_RATE, at random. Folded stacks are saved to
+# PROFILER_OUTPUT_DIR/<request id>-<random>.folded; an empty directory
+# disables this. Only the newest PROFILER_MAX_FILES profiles are kept.
+PROFILER_OUTPUT_DIR = os.environ.get("PROFILER_OUTPUT_DIR", "")
+PROFILER_MAX_FILES = int(os.environ.get("PROFILER_MAX_FILES", 500))
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", 0))
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 5))
+
+# Share of requests traced with tracemalloc, reported to the metrics in
+# METRICS_DIR and summarised by "manage.py alloc_report". 0 disables it.
+ALLOC_TRACKING_SAMPLE_RATE = float(os.environ.get("ALLOC_TRACKING_SAMPLE_RATE", 0))
+ALLOC_TRACKING_FRAMES = int(os.environ.get("ALLOC_TRACKING_FRAMES", 1))
+ALLOC_TRACKING_TOP_SITES = int(os.environ.get("ALLOC_TRACKING_TOP_SITES", 5))
+
+# Responses of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli
+# at COMPRESSION_BROTLI_QUALITY (0-11) or gzip at COMPRESSION_GZIP_LEVEL (1-9),
+# whichever the client prefers. Higher levels trade CPU time for egress.
+RESPONSE_COMPRESSION = bool(int(os.environ.get("RESPONSE_COMPRESSION", 1)))
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 512))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+
+# Seconds between the dependency checks served by /api/health-check/ready/.
+# 0 runs the checks on every probe instead of in a background thread.
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", 5))
 
 ROOT_URLCONF = "app.urls"
 
@@ -86,17 +148,80 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_POOL_SIZE > 0 shares a pool of connections between a worker's threads;
+# Django then hands connections back to the pool at the end of each request.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "CONN_MAX_AGE": 0
+        if DB_POOL_SIZE
+        else int(os.environ.get("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": bool(int(os.environ.get("DB_CONN_HEALTH_CHECKS", 1))),
+        "POOL": {
+            "MAX_SIZE": DB_POOL_SIZE,
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            "MAX_LIFETIME": float(os.environ.get("DB_CONN_MAX_LIFETIME", 3600)),
+        }
+        if DB_POOL_SIZE
+        else None,
     }
 }
 # postgresql://devuser:changeme@db:5432/devdb
 
+# Shards for recipes, tags and ingredients, as a comma separated list of
+# hosts in addition to the default database. Users are assigned to a shard
+# on first use; move them with `manage.py move_user_shard`.
+DATABASE_SHARDS = ["default"]
+for index, host in enumerate(filter(None, os.environ.get("DB_SHARD_HOSTS", "").split(",")), 1):
+    alias = f"shard_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"NAME": f"test_{DATABASES['default']['NAME']}_{alias}"},
+    }
+    DATABASE_SHARDS.append(alias)
+SHARD_DIRECTORY_CACHE_SECONDS = int(os.environ.get("SHARD_DIRECTORY_CACHE_SECONDS", 60))
+
+# Read replicas of the primary, as a comma separated list of hosts. List and
+# retrieve requests read core models from them, except for users who wrote
+# within the last DB_REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = {"default": []}
+for index, host in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS["default"].append(alias)
+
+DATABASE_ROUTERS = ["core.routers.ShardRouter", "core.routers.ReplicaRouter"]
+DB_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+# Pins are carried by a signed cookie. DB_REPLICA_PIN_CACHE also keeps them in
+# the cache for clients that drop cookies; every replica-routed read then
+# looks the pin up, so only enable it with a cache service shared by all
+# workers (CACHE_BACKEND), never a cache on the primary database.
+DB_REPLICA_PIN_CACHE = bool(int(os.environ.get("DB_REPLICA_PIN_CACHE", 0)))
+
+# Per process by default, which keeps cache lookups off the databases.
+# CACHE_BACKEND and CACHE_LOCATION select a cache service shared by all
+# workers, e.g. Redis or Memcached.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 100000))},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,6 +264,24 @@ MEDIA_URL = "/static/media/"
 
 MEDIA_ROOT = "/vol/web/media"
 STATIC_ROOT = "/vol/web/static"
+# Content-hashed names plus .gz and .br siblings written by collectstatic.
+STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+
+# Recipe images are served by nginx through an internal location; Django only
+# checks ownership and answers with an X-Accel-Redirect header.
+MEDIA_ACCEL_REDIRECT = bool(
+    int(os.environ.get("MEDIA_ACCEL_REDIRECT", 0 if DEBUG else 1))
+)
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+MEDIA_CACHE_MAX_AGE = int(os.environ.get("MEDIA_CACHE_MAX_AGE", 60 * 60 * 24))
+
+# Backend for Recipe.image. It must implement generate_upload_url() so
+# clients can upload directly to it.
+RECIPE_IMAGE_STORAGE = os.environ.get(
+    "RECIPE_IMAGE_STORAGE", "core.storage.LocalObjectStorage"
+)
+RECIPE_IMAGE_UPLOAD_EXPIRY = int(os.environ.get("RECIPE_IMAGE_UPLOAD_EXPIRY", 15 * 60))
+RECIPE_IMAGE_MAX_SIZE = int(os.environ.get("RECIPE_IMAGE_MAX_SIZE", 10 * 1024 * 1024))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -149,8 +292,51 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # JSON is orjson based, falling back to the stdlib when it is not
+    # installed. MessagePack is for internal clients that ask for it.
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.renderers.FastJSONParser",
+        "core.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
+
+# Pre-generated schema served by /api/schema/, see scripts/run.sh. When
+# empty the schema is generated on the first request of each process.
+OPENAPI_SCHEMA_FILE = os.environ.get("OPENAPI_SCHEMA_FILE", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": SLOW_QUERY_LOG_FILE,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "core": {
+            "handlers": ["console"],
+            "level": os.environ.get("LOG_LEVEL", "INFO"),
+        },
+        "core.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
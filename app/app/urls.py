@@ -14,29 +14,41 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
-
-from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
 
 from core import views as core_views
+from core.lazy import LazyView, lazy_include
 
+# Everything but the light core views is imported on first use, so a fresh
+# process can answer the health check without loading the rest of the API.
 urlpatterns = [
-    path("admin/", admin.site.urls),
     path("api/health-check/", core_views.health_check, name="health-check"),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
+    path(
+        "api/health-check/ready/",
+        core_views.readiness_check,
+        name="readiness-check",
+    ),
+    path("api/metrics/", core_views.metrics, name="metrics"),
+    path(
+        "api/storage/upload/<str:token>/",
+        core_views.storage_upload,
+        name="storage-upload",
+    ),
+    path(
+        "api/schema/",
+        LazyView("core.schema.CachedSpectacularAPIView"),
+        name="api-schema",
+    ),
     path(
         "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="api-schema"),
+        LazyView("drf_spectacular.views.SpectacularSwaggerView", url_name="api-schema"),
         name="api-docs",
     ),
-    path("api/user/", include("user.urls")),
-    path("api/recipe/", include("recipe.urls")),
+    lazy_include("admin/", "core.admin_urls", namespace="admin"),
+    lazy_include("api/user/", "user.urls", namespace="user"),
+    lazy_include("api/recipe/", "recipe.urls", namespace="recipe"),
 ]
 if settings.DEBUG:
     urlpatterns += static(
@@ -14,3 +14,22 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+try:
+    # Only importable inside a uWSGI process.
+    from uwsgidecorators import postfork
+except ImportError:
+    postfork = None
+
+# Under uWSGI the master preloads before forking and each worker warms up
+# after the fork; WARMUP_PRELOAD=0 starts fastest, routes then import what
+# they need on first use (see core.lazy). Elsewhere (runserver, tests,
+# scripts importing the application) nothing runs unless WARMUP_PRELOAD=1.
+if int(os.environ.get("WARMUP_PRELOAD", int(postfork is not None))):
+    from core import warmup
+
+    warmup.preload()
+    if postfork is None:
+        warmup.warm_worker()
+    else:
+        postfork(warmup.warm_worker)
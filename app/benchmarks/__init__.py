@@ -0,0 +1,5 @@
+"""
+Microbenchmarks for the app's hot paths.
+
+Run them with "python manage.py benchmark".
+"""
@@ -0,0 +1,255 @@
+"""
+Deterministic synthetic data set at production scale.
+
+Rows are generated per batch of users and loaded with COPY on PostgreSQL,
+or bulk_create elsewhere. Primary keys are taken from the tables' own
+sequences, so they respect the interleaved sequences of sharded setups.
+"""
+import io
+import operator
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image
+
+from core.models import Ingredient, Recipe, Tag, User, UserShard
+
+PLACEHOLDER_IMAGE = "uploads/recipe/seed-placeholder.jpg"
+
+SHARED_TAGS = (
+    "Dinner", "Lunch", "Breakfast", "Dessert", "Vegan", "Vegetarian", "Quick",
+    "Healthy", "Comfort food", "Gluten free", "Spicy", "Italian", "Mexican",
+    "Indian", "Chinese", "Japanese", "Thai", "French", "Baking", "Grill",
+    "Soup", "Salad", "Snack", "Party", "Budget", "Holiday", "Kids", "One pot",
+)
+SHARED_INGREDIENTS = (
+    "Salt", "Pepper", "Olive oil", "Butter", "Garlic", "Onion", "Flour", "Sugar",
+    "Eggs", "Milk", "Rice", "Pasta", "Tomato", "Potato", "Carrot", "Chicken",
+    "Beef", "Pork", "Tofu", "Cheese", "Cream", "Lemon", "Lime", "Ginger",
+    "Chili", "Cumin", "Paprika", "Basil", "Parsley", "Coriander", "Soy sauce",
+    "Honey", "Mushroom", "Spinach", "Bell pepper", "Beans", "Lentils", "Coconut milk",
+    "Yogurt", "Bread", "Shrimp", "Salmon", "Avocado", "Corn", "Peas", "Zucchini",
+)
+ADJECTIVES = (
+    "Classic", "Easy", "Spicy", "Creamy", "Crispy", "Smoky", "Fresh", "Rustic",
+    "Quick", "Hearty", "Zesty", "Sweet", "Garlicky", "Roasted", "Grandma's",
+)
+DISHES = (
+    "stew", "curry", "pasta", "salad", "soup", "tacos", "stir fry", "pie",
+    "risotto", "bowl", "burger", "casserole", "noodles", "cake", "sandwich",
+)
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value):
+    """Format value for COPY's text format."""
+    if value.__class__ is int:
+        return str(value)
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _zipf_weights(count, exponent=1.1):
+    """Popularity weights where a few items are far more common than the rest."""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class CopyLoader:
+    """Load rows with COPY, taking IDs from the table's sequence."""
+
+    def __init__(self, alias):
+        self.connection = connections[alias]
+
+    def insert(self, model, rows):
+        """Insert rows (dicts keyed by attname, without id) and return their IDs."""
+        if not rows:
+            return []
+        table = model._meta.db_table
+        with self.connection.cursor() as cursor:
+            # Reserve a block of IDs in one statement. The seeder assumes no
+            # concurrent inserts into the same tables while it runs.
+            cursor.execute(
+                "SELECT seq.increment_by, setval(seq.name, nextval(seq.name) + "
+                "(%s - 1) * seq.increment_by) "
+                "FROM (SELECT pg_get_serial_sequence(%s, 'id') AS name, increment_by "
+                "FROM pg_sequences WHERE schemaname || '.' || sequencename = "
+                "pg_get_serial_sequence(%s, 'id')) AS seq",
+                [len(rows), table, table],
+            )
+            increment, last = cursor.fetchone()
+            ids = range(last - (len(rows) - 1) * increment, last + 1, increment)
+
+            fields = model._meta.concrete_fields
+            values = operator.itemgetter(*(field.attname for field in fields))
+            buffer = io.StringIO()
+            for pk, row in zip(ids, rows):
+                row["id"] = pk
+                buffer.write("\t".join(map(_copy_value, values(row))) + "\n")
+            buffer.seek(0)
+            columns = ", ".join(f'"{field.column}"' for field in fields)
+            cursor.copy_expert(f'COPY "{table}" ({columns}) FROM STDIN', buffer)
+        return list(ids)
+
+
+class BulkLoader:
+    """Load rows with bulk_create, for databases without COPY."""
+
+    def __init__(self, alias, batch_size=5000):
+        self.alias = alias
+        self.batch_size = batch_size
+
+    def insert(self, model, rows):
+        """Insert rows (dicts keyed by attname, without id) and return their IDs."""
+        objs = model.objects.using(self.alias).bulk_create(
+            (model(**row) for row in rows),
+            batch_size=self.batch_size,
+        )
+        return [obj.pk for obj in objs]
+
+
+def make_loader(alias, method):
+    """Return the loader for method ("auto", "copy" or "bulk") on alias."""
+    if method == "copy" or (method == "auto" and connections[alias].vendor == "postgresql"):
+        return CopyLoader(alias)
+    return BulkLoader(alias)
+
+
+def ensure_placeholder_image():
+    """Store the image shared by seeded recipes, if it is not there yet."""
+    storage = Recipe._meta.get_field("image").storage
+    if not storage.exists(PLACEHOLDER_IMAGE):
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (200, 120, 60)).save(buffer, format="JPEG")
+        storage.save(PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+    return PLACEHOLDER_IMAGE
+
+
+class DatasetGenerator:
+    """Generate users with recipes, tags and ingredients from a seed."""
+
+    def __init__(self, seed, recipes_per_user, image_ratio=0.3, method="auto"):
+        self.seed = seed
+        self.recipes_per_user = recipes_per_user
+        self.image_ratio = image_ratio
+        self.method = method
+        self.rng = random.Random(seed)
+        self.password = make_password("seed-pass-123")
+        self.tag_weights = _zipf_weights(len(SHARED_TAGS))
+        self.ingredient_weights = _zipf_weights(len(SHARED_INGREDIENTS))
+        self.rows = 0
+
+    def email(self, index):
+        """Return the email of the index-th user of this seed."""
+        return f"seed{self.seed}-user{index}@example.com"
+
+    def generate(self, first, count):
+        """Create users first to first + count - 1 and their data."""
+        users = [
+            {
+                "password": self.password,
+                "last_login": None,
+                "is_superuser": False,
+                "email": self.email(index),
+                "name": f"Seed user {index}",
+                "is_active": True,
+                "is_staff": False,
+            }
+            for index in range(first, first + count)
+        ]
+        user_ids = make_loader("default", self.method).insert(User, users)
+        self.rows += len(users)
+
+        shards = settings.DATABASE_SHARDS
+        by_shard = {}
+        for user_id in user_ids:
+            by_shard.setdefault(shards[user_id % len(shards)], []).append(user_id)
+        # Bulk inserts skip the signal recording new users' shards. The
+        # table is keyed by user, so COPY has no ID sequence to reserve from.
+        BulkLoader("default").insert(
+            UserShard,
+            [
+                {"user_id": user_id, "shard": shard, "moving": False}
+                for shard, ids in by_shard.items()
+                for user_id in ids
+            ],
+        )
+        for shard, ids in by_shard.items():
+            self.generate_recipes(make_loader(shard, self.method), ids)
+
+    def _names(self, shared, weights, shared_count, unique_count):
+        """Pick popular shared names plus a few names unique to one user."""
+        names = set()
+        while len(names) < min(shared_count, len(shared)):
+            names.add(self.rng.choices(shared, weights)[0])
+        for i in range(unique_count):
+            names.add(f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(shared).lower()} {i}")
+        return sorted(names)
+
+    def generate_recipes(self, loader, user_ids):
+        """Create tags, ingredients, recipes and their links for user_ids."""
+        rng = self.rng
+        tags, ingredients, recipes = [], [], []
+        for user_id in user_ids:
+            for name in self._names(
+                SHARED_TAGS, self.tag_weights, rng.randint(2, 8), rng.randint(0, 3)
+            ):
+                tags.append({"name": name, "user_id": user_id})
+            for name in self._names(
+                SHARED_INGREDIENTS,
+                self.ingredient_weights,
+                rng.randint(8, 25),
+                rng.randint(0, 5),
+            ):
+                ingredients.append({"name": name, "user_id": user_id})
+            # Most users have a few recipes, some have many.
+            count = round(rng.gammavariate(2, self.recipes_per_user / 2))
+            for _ in range(count):
+                recipes.append(
+                    {
+                        "user_id": user_id,
+                        "title": f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}",
+                        "description": "Generated recipe." if rng.random() < 0.7 else "",
+                        "time_minutes": max(5, int(rng.lognormvariate(3.3, 0.6))),
+                        "price": Decimal(min(999, rng.lognormvariate(2.3, 0.7))).quantize(
+                            Decimal("0.01")
+                        ),
+                        "link": "https://example.com/recipe" if rng.random() < 0.4 else "",
+                        "image": PLACEHOLDER_IMAGE if rng.random() < self.image_ratio else "",
+                    }
+                )
+
+        tag_ids = loader.insert(Tag, tags)
+        ingredient_ids = loader.insert(Ingredient, ingredients)
+        recipe_ids = loader.insert(Recipe, recipes)
+
+        tags_by_user, ingredients_by_user = {}, {}
+        for row, pk in zip(tags, tag_ids):
+            tags_by_user.setdefault(row["user_id"], []).append(pk)
+        for row, pk in zip(ingredients, ingredient_ids):
+            ingredients_by_user.setdefault(row["user_id"], []).append(pk)
+
+        recipe_tags, recipe_ingredients = [], []
+        for row, recipe_id in zip(recipes, recipe_ids):
+            user_tags = tags_by_user[row["user_id"]]
+            for tag_id in rng.sample(user_tags, min(len(user_tags), rng.randint(1, 4))):
+                recipe_tags.append({"recipe_id": recipe_id, "tag_id": tag_id})
+            user_ingredients = ingredients_by_user[row["user_id"]]
+            for ingredient_id in rng.sample(
+                user_ingredients, min(len(user_ingredients), rng.randint(3, 10))
+            ):
+                recipe_ingredients.append({"recipe_id": recipe_id, "ingredient_id": ingredient_id})
+        loader.insert(Recipe.tags.through, recipe_tags)
+        loader.insert(Recipe.ingredients.through, recipe_ingredients)
+
+        self.rows += sum(
+            len(rows) for rows in (tags, ingredients, recipes, recipe_tags, recipe_ingredients)
+        )
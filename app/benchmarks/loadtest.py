@@ -0,0 +1,156 @@
+"""
+In-process load generator driving the WSGI application directly.
+"""
+import io
+import json
+import random
+import time
+from urllib.parse import urlencode
+
+from django.db import connections
+from django.urls import reverse
+
+DEFAULT_MIX = {
+    "recipe-list": 35,
+    "recipe-list-filtered": 10,
+    "recipe-detail": 15,
+    "recipe-create": 10,
+    "tag-list": 10,
+    "ingredient-list": 10,
+    "user-me": 5,
+    "token": 5,
+}
+
+
+def parse_mix(value):
+    """Parse "name:weight,name:weight" into a dict, checking the names."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition(":")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint {name!r}, choose from {', '.join(DEFAULT_MIX)}.")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def build_environ(host, method, path, query=None, body=None, token=None):
+    """Return a WSGI environ for a request, with body encoded as JSON."""
+    data = json.dumps(body).encode() if body is not None else b""
+    environ = {
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": urlencode(query or {}),
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": host,
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(data),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if data:
+        environ["CONTENT_TYPE"] = "application/json"
+        environ["CONTENT_LENGTH"] = str(len(data))
+    if token:
+        environ["HTTP_AUTHORIZATION"] = f"Token {token}"
+    return environ
+
+
+def make_request(name, client, rng):
+    """Return (method, path, query, body, token) for endpoint name."""
+    token = client["token"]
+    if name == "recipe-list":
+        return "GET", reverse("recipe:recipe-list"), None, None, token
+    if name == "recipe-list-filtered":
+        query = {"tags": str(rng.choice(client["tag_ids"]))}
+        return "GET", reverse("recipe:recipe-list"), query, None, token
+    if name == "recipe-detail":
+        path = reverse("recipe:recipe-detail", args=[rng.choice(client["recipe_ids"])])
+        return "GET", path, None, None, token
+    if name == "recipe-create":
+        body = {
+            "title": f"Load test recipe {rng.randrange(1_000_000)}",
+            "time_minutes": rng.randint(5, 120),
+            "price": f"{rng.uniform(1, 50):.2f}",
+            "tags": [{"name": f"Load tag {rng.randrange(10)}"}],
+            "ingredients": [{"name": f"Load ingredient {rng.randrange(20)}"}],
+        }
+        return "POST", reverse("recipe:recipe-list"), None, body, token
+    if name == "tag-list":
+        return "GET", reverse("recipe:tag-list"), None, None, token
+    if name == "ingredient-list":
+        return "GET", reverse("recipe:ingredient-list"), None, None, token
+    if name == "user-me":
+        return "GET", reverse("user:me"), None, None, token
+    body = {"email": client["email"], "password": client["password"]}
+    return "POST", reverse("user:token"), None, body, None
+
+
+def run_worker(application, host, client, mix, deadline, max_requests, seed):
+    """Send requests until deadline or max_requests, return (endpoint, status, seconds)."""
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    results = []
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split(" ", 1)[0]))
+
+    try:
+        while time.monotonic() < deadline and (max_requests is None or len(results) < max_requests):
+            name = rng.choices(names, weights)[0]
+            method, path, query, body, token = make_request(name, client, rng)
+            environ = build_environ(host, method, path, query, body, token)
+            start = time.perf_counter()
+            response = application(environ, start_response)
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            results.append((name, statuses.pop(), time.perf_counter() - start))
+    finally:
+        connections.close_all()
+    return results
+
+
+def run_process_worker(*args):
+    """run_worker for a pool process, which loads its own application."""
+    from app.wsgi import application
+
+    return run_worker(application, *args)
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of already sorted values."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, elapsed):
+    """Return per-endpoint count, errors, throughput and latency percentiles."""
+    by_endpoint = {}
+    for name, status, seconds in results:
+        by_endpoint.setdefault(name, []).append((status, seconds))
+    by_endpoint["total"] = [(status, seconds) for _, status, seconds in results]
+
+    summary = {}
+    for name, samples in by_endpoint.items():
+        latencies = sorted(seconds for _, seconds in samples)
+        if not latencies:
+            continue
+        summary[name] = {
+            "requests": len(samples),
+            "errors": sum(1 for status, _ in samples if status >= 400),
+            "rps": len(samples) / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+        }
+    return summary
@@ -0,0 +1,293 @@
+"""
+Benchmarks for recipe serializers, querysets, JSON and MessagePack rendering,
+response compression, the middleware stack and token authentication.
+"""
+import json
+from decimal import Decimal
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.base import BaseHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.runner import benchmark
+from core.compression import Compressor
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import (
+    FastJSONParser,
+    FastJSONRenderer,
+    MessagePackParser,
+    MessagePackRenderer,
+)
+from recipe import serializers
+from recipe.views import RecipeViewSet
+
+
+def seed(recipes=100, tags=20, ingredients=20):
+    """Create a user with recipes, each linked to a few tags and ingredients."""
+    user = get_user_model().objects.create_user(
+        email="benchmark@example.com",
+        password="benchmark-pass",
+    )
+    token = Token.objects.create(user=user)
+    tag_objs = Tag.objects.bulk_create(Tag(user=user, name=f"Tag {i}") for i in range(tags))
+    ingredient_objs = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f"Ingredient {i}") for i in range(ingredients)
+    )
+    recipe_objs = Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f"Recipe {i}",
+            time_minutes=10 + i % 50,
+            price=Decimal("4.50"),
+            description="Benchmark recipe.",
+        )
+        for i in range(recipes)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag_objs[(i + j) % tags])
+        for i, recipe in enumerate(recipe_objs)
+        for j in range(3)
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(recipe=recipe, ingredient=ingredient_objs[(i + j) % ingredients])
+        for i, recipe in enumerate(recipe_objs)
+        for j in range(3)
+    )
+
+    http_request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {token.key}")
+    request = Request(http_request)
+    request.user = user
+    return SimpleNamespace(
+        user=user,
+        token=token,
+        http_request=http_request,
+        request=request,
+        recipe=recipe_objs[0],
+        tags=tag_objs,
+        ingredients=ingredient_objs,
+    )
+
+
+def _payload(fixtures):
+    return {
+        "title": "Benchmark payload",
+        "time_minutes": 30,
+        "price": "12.50",
+        "description": "Validated many times.",
+        "link": "https://example.com/recipe",
+        "tags": [{"name": tag.name} for tag in fixtures.tags[:3]],
+        "ingredients": [{"name": ingredient.name} for ingredient in fixtures.ingredients[:3]],
+    }
+
+
+def _list_view(fixtures, **params):
+    """Return a RecipeViewSet set up for a list request with query params."""
+    view = RecipeViewSet(action="list", format_kwarg=None)
+    http_request = APIRequestFactory().get("/", params)
+    view.request = Request(http_request)
+    view.request.user = fixtures.user
+    return view
+
+
+@benchmark("serializer.recipe_list")
+def recipe_list_serialization(fixtures):
+    """Serialize every recipe of the user for the list view."""
+    recipes = list(
+        Recipe.objects.filter(user=fixtures.user).prefetch_related("tags", "ingredients")
+    )
+    return lambda: serializers.RecipeSerializer(recipes, many=True).data
+
+
+@benchmark("serializer.recipe_detail")
+def recipe_detail_serialization(fixtures):
+    """Serialize one recipe for the detail view."""
+    context = {"request": fixtures.request}
+    recipe = Recipe.objects.prefetch_related("tags", "ingredients").get(pk=fixtures.recipe.pk)
+    return lambda: serializers.RecipeDetailSerializer(recipe, context=context).data
+
+
+@benchmark("serializer.recipe_validation")
+def recipe_validation(fixtures):
+    """Validate a recipe payload with nested tags and ingredients."""
+    payload = _payload(fixtures)
+
+    def validate():
+        serializer = serializers.RecipeSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+
+    return validate
+
+
+@benchmark("serializer.recipe_detail_validation")
+def recipe_detail_validation(fixtures):
+    """Validate a detail payload with nested tags and ingredients."""
+    payload = _payload(fixtures)
+
+    def validate():
+        serializer = serializers.RecipeDetailSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+
+    return validate
+
+
+@benchmark("serializer.get_or_create_tags")
+def get_or_create_tags(fixtures):
+    """Link existing tags to a recipe by name."""
+    serializer = serializers.RecipeSerializer(context={"request": fixtures.request})
+    tags = [{"name": tag.name} for tag in fixtures.tags[:5]]
+    return lambda: serializer._get_or_create_tags(tags, fixtures.recipe)
+
+
+def _recipe_list_data(fixtures):
+    recipes = Recipe.objects.filter(user=fixtures.user).prefetch_related("tags", "ingredients")
+    return serializers.RecipeSerializer(recipes, many=True).data
+
+
+@benchmark("renderer.recipe_list_json")
+def recipe_list_json(fixtures):
+    """Render the recipe list with DRF's stdlib JSONRenderer."""
+    data = _recipe_list_data(fixtures)
+    return lambda: JSONRenderer().render(data, "application/json")
+
+
+@benchmark("renderer.recipe_list_fast")
+def recipe_list_fast(fixtures):
+    """Render the recipe list with FastJSONRenderer."""
+    data = _recipe_list_data(fixtures)
+    return lambda: FastJSONRenderer().render(data, "application/json")
+
+
+@benchmark("renderer.recipe_list_msgpack")
+def recipe_list_msgpack(fixtures):
+    """Render the recipe list with MessagePackRenderer."""
+    data = _recipe_list_data(fixtures)
+    return lambda: MessagePackRenderer().render(data, "application/msgpack")
+
+
+def _compress(content, encoding):
+    compressor = Compressor(encoding)
+    return compressor.compress(content) + compressor.finish()
+
+
+@benchmark("compression.recipe_list_gzip")
+def recipe_list_gzip(fixtures):
+    """Gzip the rendered recipe list at COMPRESSION_GZIP_LEVEL."""
+    content = FastJSONRenderer().render(_recipe_list_data(fixtures))
+    return lambda: _compress(content, "gzip")
+
+
+@benchmark("compression.recipe_list_brotli")
+def recipe_list_brotli(fixtures):
+    """Brotli-compress the rendered recipe list at COMPRESSION_BROTLI_QUALITY."""
+    content = FastJSONRenderer().render(_recipe_list_data(fixtures))
+    return lambda: _compress(content, "br")
+
+
+@benchmark("parser.recipe_json")
+def recipe_json_parse(fixtures):
+    """Parse a recipe payload with DRF's stdlib JSONParser."""
+    body = json.dumps(_payload(fixtures)).encode()
+    return lambda: JSONParser().parse(BytesIO(body), "application/json", {"encoding": "utf-8"})
+
+
+@benchmark("parser.recipe_fast")
+def recipe_fast_parse(fixtures):
+    """Parse a recipe payload with FastJSONParser."""
+    body = json.dumps(_payload(fixtures)).encode()
+    return lambda: FastJSONParser().parse(
+        BytesIO(body), "application/json", {"encoding": "utf-8"}
+    )
+
+
+@benchmark("parser.recipe_msgpack")
+def recipe_msgpack_parse(fixtures):
+    """Parse a recipe payload with MessagePackParser."""
+    body = MessagePackRenderer().render(_payload(fixtures))
+    return lambda: MessagePackParser().parse(BytesIO(body), "application/msgpack")
+
+
+@benchmark("queryset.recipe_list")
+def recipe_list_queryset(fixtures):
+    """Evaluate the recipe list queryset."""
+    view = _list_view(fixtures)
+    return lambda: list(view.get_queryset())
+
+
+@benchmark("queryset.recipe_list_filtered")
+def recipe_list_filtered_queryset(fixtures):
+    """Evaluate the recipe list queryset filtered by tags and ingredients."""
+    view = _list_view(
+        fixtures,
+        tags=",".join(str(tag.id) for tag in fixtures.tags[:2]),
+        ingredients=",".join(str(ingredient.id) for ingredient in fixtures.ingredients[:2]),
+    )
+    return lambda: list(view.get_queryset())
+
+
+@benchmark("auth.token")
+def token_authentication(fixtures):
+    """Authenticate a request by token."""
+    authentication = TokenAuthentication()
+    return lambda: authentication.authenticate(Request(fixtures.http_request))
+
+
+class _StubViewHandler(BaseHandler):
+    """Handler answering every request with an empty response.
+
+    Only the process_view hooks run in place of URL resolution and a view, so
+    the benchmarks time the middleware alone.
+    """
+
+    def _get_response(self, request):
+        for hook in self._view_middleware:
+            hook(request, _stub_view, (), {})
+        return HttpResponse()
+
+
+def _stub_view(request):
+    return HttpResponse()
+
+
+def _api_request(fixtures, scoped):
+    """Return a function sending a token API request through the middleware.
+
+    Unless scoped, BROWSER_MIDDLEWARE is listed in MIDDLEWARE in place of
+    PathScopedMiddleware, so it runs for the API too.
+    """
+    middleware = list(settings.MIDDLEWARE)
+    if not scoped:
+        position = middleware.index("core.middleware.PathScopedMiddleware")
+        middleware[position:position + 1] = settings.BROWSER_MIDDLEWARE
+    handler = _StubViewHandler()
+    with override_settings(MIDDLEWARE=middleware):
+        handler.load_middleware()
+
+    factory = RequestFactory(
+        HTTP_HOST=(settings.ALLOWED_HOSTS or ["localhost"])[0].lstrip("."),
+        HTTP_AUTHORIZATION=f"Token {fixtures.token.key}",
+    )
+    path = reverse("recipe:tag-list")
+    return lambda: handler.get_response(factory.get(path))
+
+
+@benchmark("middleware.api_request_full")
+def api_request_full(fixtures):
+    """Pass a token API request through session, CSRF, auth and message middleware."""
+    return _api_request(fixtures, scoped=False)
+
+
+@benchmark("middleware.api_request_scoped")
+def api_request_scoped(fixtures):
+    """Pass a token API request through PathScopedMiddleware, which skips them."""
+    return _api_request(fixtures, scoped=True)
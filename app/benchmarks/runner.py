@@ -0,0 +1,76 @@
+"""
+Benchmark registry, runner and baseline comparison.
+"""
+import json
+import statistics
+import time
+
+_registry = {}
+
+
+def benchmark(name):
+    """Register a benchmark function taking the seeded fixtures."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def registered(pattern=None):
+    """Return the registered benchmarks whose name contains pattern."""
+    return {
+        name: func
+        for name, func in sorted(_registry.items())
+        if not pattern or pattern in name
+    }
+
+
+def measure(func, warmup=2, repeats=5, number=10):
+    """Time func, return per-call statistics in seconds over repeats runs.
+
+    Each run calls func number times after warmup untimed runs.
+    """
+    for _ in range(warmup * number):
+        func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    median = statistics.median(samples)
+    return {
+        "min": min(samples),
+        "median": median,
+        "mean": statistics.mean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_sec": 1 / median if median else float("inf"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Compare results with a baseline, return rows for benchmarks in both.
+
+    Each row is (name, baseline median, relative change, regressed), where a
+    change of 0.25 means 25% slower and regressed is change > tolerance.
+    """
+    rows = []
+    for name, stats in results.items():
+        if name in baseline:
+            expected = baseline[name]["median"]
+            change = stats["median"] / expected - 1
+            rows.append((name, expected, change, change > tolerance))
+    return rows
+
+
+def load_baseline(path):
+    """Return the results stored at path."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """Store results at path as a baseline for later runs."""
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,6 @@
+"""
+Admin URLconf, included lazily by app.urls.
+"""
+from django.contrib import admin
+
+urlpatterns = admin.site.get_urls()
@@ -0,0 +1,51 @@
+"""
+Per-request memory allocation tracking with tracemalloc.
+
+tracemalloc traces the whole process, so only one request per process is
+traced at a time; requests arriving meanwhile are not sampled.
+"""
+import os
+import threading
+import tracemalloc
+
+from django.conf import settings
+
+_tracing = threading.Lock()
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def start():
+    """Start tracing if no other request is traced, return whether it started."""
+    if tracemalloc.is_tracing() or not _tracing.acquire(blocking=False):
+        return False
+    tracemalloc.start(settings.ALLOC_TRACKING_FRAMES)
+    return True
+
+
+def stop(limit):
+    """Stop tracing, return the peak and the limit largest (site, bytes) pairs."""
+    try:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    finally:
+        tracemalloc.stop()
+        _tracing.release()
+    sites = [
+        (_site(stat.traceback[0]), stat.size)
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+    return peak, sites
+
+
+def _site(frame):
+    filename = frame.filename
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f"{filename}:{frame.lineno}"
@@ -0,0 +1,118 @@
+"""
+Response compression for CompressionMiddleware.
+
+Responses are compressed with brotli, when it is installed, or gzip,
+whichever the client weighs higher in Accept-Encoding. Compressor keeps
+track of the bytes in and out and the CPU time spent, so the levels can be
+tuned against egress.
+"""
+import time
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# HTML is left out: admin pages mix CSRF tokens with reflected input, which
+# compression would expose to BREACH. Images, archives and fonts are already
+# compressed.
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/msgpack",
+    "application/vnd.oai.openapi",
+    "application/xml",
+    "application/yaml",
+}
+
+
+def is_compressible(content_type):
+    """Return whether a response of content_type is worth compressing."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type.startswith("text/"):
+        return media_type != "text/html"
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith(("+json", "+xml"))
+
+
+def should_compress(response):
+    """Return whether response can be compressed, whatever the client accepts."""
+    if response.status_code in (204, 206, 304):
+        return False
+    if response.has_header("Content-Encoding") or response.has_header("X-Accel-Redirect"):
+        return False
+    if "no-transform" in response.get("Cache-Control", ""):
+        return False
+    if not is_compressible(response.get("Content-Type", "")):
+        return False
+    return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+
+def negotiate(accept_encoding):
+    """Return "br", "gzip" or None for an Accept-Encoding header value."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    # At equal weights brotli wins, it compresses JSON better at the same CPU.
+    best, best_weight = None, 0.0
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class Compressor:
+    """Incremental brotli or gzip compressor counting bytes and CPU time."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_time = 0.0
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._process, self._flush = compressor.process, compressor.flush
+            self._finish = compressor.finish
+        else:
+            # wbits 31 writes a gzip header and trailer.
+            compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._process = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def compress(self, data, flush=False):
+        """Compress data; with flush, return all of it, ready to be sent."""
+        start = time.thread_time()
+        output = self._process(data)
+        if flush:
+            output += self._flush()
+        self.cpu_time += time.thread_time() - start
+        self.bytes_in += len(data)
+        self.bytes_out += len(output)
+        return output
+
+    def finish(self):
+        """Return the end of the compressed stream."""
+        start = time.thread_time()
+        output = self._finish()
+        self.cpu_time += time.thread_time() - start
+        self.bytes_out += len(output)
+        return output
+
+    @property
+    def ratio(self):
+        """Compressed size as a share of the original size."""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
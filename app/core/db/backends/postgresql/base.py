@@ -0,0 +1,87 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+
+Extra keys read from the DATABASES entry:
+
+CONN_HEALTH_CHECKS: ping persistent connections with ``SELECT 1`` before
+    their first use in each request, so a connection dropped by the server
+    or a proxy is replaced instead of failing the request.
+POOL: dict of ConnectionPool options (MAX_SIZE, TIMEOUT, MAX_LIFETIME,
+    CHECK_AFTER). When set, connections are checked out of a pool shared by
+    the worker's threads and returned to it when Django closes them.
+"""
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections before the test database is dropped."""
+
+    def destroy_test_db(self, *args, **kwargs):
+        self.connection.close()
+        pool = self.connection.pool
+        if pool is not None:
+            pool.close_all()
+        return super().destroy_test_db(*args, **kwargs)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL database wrapper with health checks and pooling."""
+
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def pool(self):
+        """Return this worker's pool for the database, or None."""
+        options = self.settings_dict.get("POOL")
+        if not options:
+            return None
+        return get_pool(
+            (self.alias, self.settings_dict["HOST"], self.settings_dict["NAME"]),
+            name=self.alias,
+            max_size=options.get("MAX_SIZE", 10),
+            timeout=options.get("TIMEOUT", 10.0),
+            max_lifetime=options.get("MAX_LIFETIME", 3600.0),
+            check_after=options.get("CHECK_AFTER", 30.0),
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        return pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection)
+
+    def connect(self):
+        super().connect()
+        # A fresh connection needs no check, a pooled one was checked by the pool.
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it no longer answers."""
+        if self.connection is None or self.health_check_done:
+            return
+        if not self.settings_dict.get("CONN_HEALTH_CHECKS"):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,197 @@
+"""
+Worker-local database connection pool.
+"""
+import os
+import threading
+import time
+
+from core import metrics
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available in time."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections shared by a worker's threads.
+
+    Connections older than ``max_lifetime`` are recycled on checkout and on
+    release, and idle connections are pinged with ``SELECT 1`` before reuse
+    once they have been idle for ``check_after`` seconds. Waits, checkout
+    times and connection churn are recorded in core.metrics, labelled with
+    the pool's ``name``.
+    """
+
+    def __init__(
+        self, name="default", max_size=10, timeout=10.0, max_lifetime=3600.0, check_after=30.0
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._cond = threading.Condition()
+        self._idle = []
+        self._created = {}
+        self._checked_out = {}
+        self._size = 0
+        self._stats = {
+            "checkouts": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "checkout_seconds_total": 0.0,
+            "checkout_seconds_max": 0.0,
+        }
+
+    def acquire(self, connect):
+        """Check out a connection, calling connect() to open new ones."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._cond:
+                reserved = self._reserve(deadline)
+            if reserved is None:
+                conn = None
+                break
+            conn, released_at = reserved
+            # Checked outside the lock: a dead server can take a TCP timeout
+            # to answer, and must not hold up the other threads.
+            if self._expired(conn) or (
+                start - released_at > self.check_after and not self._is_usable(conn)
+            ):
+                self._discard(conn)
+                continue
+            break
+
+        if conn is None:
+            try:
+                conn = connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created[conn] = time.monotonic()
+                self._stats["connections_created"] += 1
+            metrics.DB_POOL_CONNECTIONS.inc(database=self.name, event="created")
+
+        now = time.monotonic()
+        waited = now - start
+        with self._cond:
+            self._checked_out[conn] = now
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        metrics.DB_POOL_WAIT.observe(waited, database=self.name)
+        return conn
+
+    def _reserve(self, deadline):
+        """Pop an idle (conn, released_at), or return None for a new slot.
+
+        Must hold the lock.
+        """
+        while True:
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._stats["timeouts"] += 1
+                metrics.DB_POOL_TIMEOUTS.inc(database=self.name)
+                raise PoolTimeout(f"No database connection available after {self.timeout}s.")
+            self._cond.wait(remaining)
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding it if unusable."""
+        try:
+            if not getattr(conn, "closed", False):
+                conn.rollback()
+        except Exception:
+            conn_ok = False
+        else:
+            conn_ok = not getattr(conn, "closed", False)
+
+        keep = conn_ok and not self._expired(conn)
+        with self._cond:
+            checked_out_at = self._checked_out.pop(conn, None)
+            if checked_out_at is not None:
+                held = time.monotonic() - checked_out_at
+                self._stats["checkout_seconds_total"] += held
+                self._stats["checkout_seconds_max"] = max(
+                    self._stats["checkout_seconds_max"], held
+                )
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+        if checked_out_at is not None:
+            metrics.DB_POOL_CHECKOUT.observe(held, database=self.name)
+        if not keep:
+            self._discard(conn)
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._checked_out),
+            }
+
+    def _expired(self, conn):
+        created = self._created.get(conn)
+        return created is not None and time.monotonic() - created > self.max_lifetime
+
+    def _is_usable(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, conn):
+        """Close conn, then free its slot. Must not hold the lock."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created.pop(conn, None)
+            self._size -= 1
+            self._stats["connections_recycled"] += 1
+            self._cond.notify()
+        metrics.DB_POOL_CONNECTIONS.inc(database=self.name, event="recycled")
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, **options):
+    """Return the pool for key in this process, creating it if needed.
+
+    Pools are keyed by process ID as well so a pool created in the uWSGI
+    master is never shared with forked workers.
+    """
+    key = (os.getpid(), key)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
@@ -0,0 +1,166 @@
+"""
+Dependency checks for the readiness probe.
+
+Each worker checks its databases, cache and media volume in a background
+thread every HEALTH_CHECK_INTERVAL seconds, and the readiness view serves
+the last result, so probes cost no queries. A failing primary or shard
+database makes the worker unavailable; failing replicas, cache or media
+only degrade it.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db import connections
+
+from core.models import Recipe
+
+logger = logging.getLogger("core.health")
+
+
+def check_database(alias):
+    """Run SELECT 1 on alias, replacing a connection that went bad."""
+    connection = connections[alias]
+    # A connection inside a transaction (checked inline, e.g. in tests) is
+    # left alone.
+    replaceable = not connection.in_atomic_block
+    if replaceable:
+        connection.close_if_unusable_or_obsolete()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except Exception:
+        if replaceable:
+            connection.close()
+        raise
+
+
+_CACHE_KEY = f"health-check:{uuid.uuid4().hex}"
+
+
+def check_cache():
+    """Read back this worker's key from the default cache.
+
+    The key is written only when it is missing, on the first check or
+    after an eviction, so a healthy cache costs one read per check.
+    """
+    if cache.get(_CACHE_KEY) == 1:
+        return
+    cache.set(_CACHE_KEY, 1, None)
+    if cache.get(_CACHE_KEY) != 1:
+        raise RuntimeError("Cache did not return the value just written.")
+
+
+def check_media():
+    """Check the recipe image storage is reachable, and writable if local."""
+    storage = Recipe._meta.get_field("image").storage
+    if isinstance(storage, FileSystemStorage):
+        if not os.access(storage.location, os.W_OK):
+            raise OSError(f"{storage.location} is not a writable directory.")
+    else:
+        storage.exists("health-check")
+
+
+def get_checks():
+    """Return (name, check, critical) for every dependency."""
+    checks = [
+        (f"database:{alias}", lambda alias=alias: check_database(alias), True)
+        for alias in dict.fromkeys(["default", *settings.DATABASE_SHARDS])
+    ]
+    checks += [
+        (f"database:{alias}", lambda alias=alias: check_database(alias), False)
+        for replicas in settings.DATABASE_REPLICAS.values()
+        for alias in replicas
+    ]
+    checks += [("cache", check_cache, False), ("media", check_media, False)]
+    return checks
+
+
+def run_checks():
+    """Run every check and return the readiness report."""
+    results = {}
+    status = "ok"
+    for name, check, critical in get_checks():
+        start = time.perf_counter()
+        try:
+            check()
+        except Exception as exc:
+            logger.warning("Health check %s failed: %s", name, exc)
+            result = {"ok": False, "error": str(exc) or exc.__class__.__name__}
+            if critical:
+                status = "unavailable"
+            elif status == "ok":
+                status = "degraded"
+        else:
+            result = {"ok": True}
+        result["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        results[name] = result
+    return {"status": status, "checked_at": time.time(), "checks": results}
+
+
+class HealthChecker:
+    """Run the checks in a background thread and keep the last report.
+
+    Threads do not survive a fork, so the thread is started by the first
+    report() in each process. With an interval of 0 the checks run on every
+    call instead, which tests and debugging use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._report = None
+        self._stop = None
+
+    def report(self):
+        """Return the last report, with its age and staleness."""
+        interval = settings.HEALTH_CHECK_INTERVAL
+        if not interval:
+            return self._annotate(run_checks(), interval)
+
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # The first report of a process is checked inline, so
+                    # the probe does not see a stale report from the master.
+                    self._report = run_checks()
+                    self._pid = os.getpid()
+                    self._stop = threading.Event()
+                    threading.Thread(
+                        target=self._run,
+                        args=(interval, self._stop),
+                        name="health-checker",
+                        daemon=True,
+                    ).start()
+        return self._annotate(self._report, interval)
+
+    def stop(self):
+        """Stop this process's background checks."""
+        if self._stop is not None:
+            self._stop.set()
+        self._pid = None
+
+    def _run(self, interval, stop):
+        while not stop.wait(interval):
+            try:
+                self._report = run_checks()
+            except Exception:
+                logger.exception("Health checks crashed.")
+        connections.close_all()
+
+    def _annotate(self, report, interval):
+        age = time.time() - report["checked_at"]
+        report = {**report, "age_ms": round(age * 1000, 2)}
+        # A hung check (e.g. an unreachable database host) stops the updates.
+        if interval and age > 3 * interval:
+            report["status"] = "unavailable"
+            report["stale"] = True
+        return report
+
+
+checker = HealthChecker()
@@ -0,0 +1,96 @@
+"""
+Per-request instrumentation shared by the middleware in core.middleware.
+"""
+import contextvars
+import time
+
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Timings collected while handling one request."""
+
+    __slots__ = (
+        "view",
+        "start",
+        "query_count",
+        "sql_time",
+        "serializer_time",
+        "render_start",
+        "render_time",
+        "_serializing",
+    )
+
+    def __init__(self):
+        self.view = None
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.render_start = None
+        self.render_time = 0.0
+        self._serializing = False
+
+    def activate(self):
+        """Make these the metrics of the current request, return a reset token."""
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+
+def current_metrics():
+    """Return the metrics of the request being handled, or None."""
+    return _current.get()
+
+
+def view_label(request, view_func):
+    """Return a name such as "RecipeViewSet.list" for the view handling request."""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return getattr(view_func, "__name__", "unknown")
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method, method)}"
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Database execute wrapper adding query count and time to the request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.query_count += 1
+        metrics.sql_time += time.perf_counter() - start
+
+
+class TimedSerializerMixin:
+    """Add serializer time to the request metrics when timing is enabled.
+
+    Only the outermost serializer call is timed, so nested serializers are
+    not counted twice.
+    """
+
+    def _timed(self, method, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics._serializing:
+            return method(*args, **kwargs)
+        metrics._serializing = True
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics._serializing = False
+
+    def to_representation(self, instance):
+        return self._timed(super().to_representation, instance)
+
+    def run_validation(self, *args, **kwargs):
+        # No data=empty default: that would import DRF with the middleware.
+        return self._timed(super().run_validation, *args, **kwargs)
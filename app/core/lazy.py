@@ -0,0 +1,55 @@
+"""
+Lazy URL patterns for routes that need heavy modules.
+
+Django resolves a request by trying the patterns in order, so views and
+URLconfs declared here are only imported once a request (or a reverse())
+reaches them, and the health check never pays for the schema generator,
+the admin or the API serializers.
+"""
+from django.urls import URLResolver
+from django.urls.resolvers import RoutePattern
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """View imported from view_path on its first use.
+
+    Classes are turned into views with as_view(**initkwargs). Attributes
+    Django and DRF read from views, such as csrf_exempt or cls, are looked
+    up on the real view.
+    """
+
+    def __init__(self, view_path, **initkwargs):
+        self.view_path = view_path
+        self.initkwargs = initkwargs
+
+    @cached_property
+    def view(self):
+        view = import_string(self.view_path)
+        if hasattr(view, "as_view"):
+            view = view.as_view(**self.initkwargs)
+        return view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        # Only reached for attributes missing on the instance; guard the ones
+        # looked up before __init__ ran (copy, pickle).
+        if name in ("view_path", "initkwargs", "view"):
+            raise AttributeError(name)
+        return getattr(self.view, name)
+
+    def __repr__(self):
+        return f"<LazyView {self.view_path}>"
+
+
+def lazy_include(route, urlconf, namespace=None):
+    """Like path(route, include(urlconf)), but import urlconf on first use."""
+    return URLResolver(
+        RoutePattern(route, is_endpoint=False),
+        urlconf,
+        app_name=namespace,
+        namespace=namespace,
+    )
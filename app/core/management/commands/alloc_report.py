@@ -0,0 +1,59 @@
+"""
+Django command to summarise which endpoints allocate the most memory.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import metrics
+
+
+def _format_bytes(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class Command(BaseCommand):
+    """Django command to report allocation metrics per view."""
+
+    help = "Summarise peak allocations and top allocation sites per view."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sites",
+            type=int,
+            default=3,
+            help="Number of allocation sites to show per view.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if not settings.METRICS_DIR:
+            raise CommandError("METRICS_DIR is not set.")
+
+        views = {}
+        for (name, labels), value in metrics.collect().items():
+            labels = dict(labels)
+            if name.startswith(metrics.ALLOCATED_PEAK.name):
+                view = views.setdefault(labels["view"], {"sites": {}})
+                view[name[len(metrics.ALLOCATED_PEAK.name) + 1:]] = value
+            elif name == metrics.ALLOCATION_SITES.name:
+                view = views.setdefault(labels["view"], {"sites": {}})
+                view["sites"][labels["site"]] = value
+
+        views = {name: view for name, view in views.items() if view.get("count")}
+        if not views:
+            self.stdout.write("No traced requests yet.")
+            return
+
+        ranked = sorted(views.items(), key=lambda item: item[1]["sum"] / item[1]["count"])
+        for name, view in reversed(ranked):
+            count = int(view["count"])
+            self.stdout.write(
+                f"{name}: {count} traced, mean peak {_format_bytes(view['sum'] / count)}"
+            )
+            sites = sorted(view["sites"].items(), key=lambda item: -item[1])
+            for site, size in sites[:options["sites"]]:
+                self.stdout.write(f"    {site}: {_format_bytes(size / count)} per request")
@@ -0,0 +1,71 @@
+"""
+Django command to run the microbenchmarks in the benchmarks package.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from benchmarks import recipes, runner
+
+
+class Command(BaseCommand):
+    """Django command to benchmark serializers, querysets and authentication."""
+
+    help = (
+        "Seed a throwaway data set, time the registered benchmarks and "
+        "optionally compare them with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filter", help="Only run benchmarks whose name contains this.")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed runs first.")
+        parser.add_argument("--repeats", type=int, default=5, help="Timed runs.")
+        parser.add_argument("--number", type=int, default=10, help="Calls per run.")
+        parser.add_argument("--recipes", type=int, default=100, help="Recipes to seed.")
+        parser.add_argument("--save", metavar="PATH", help="Store results as a baseline.")
+        parser.add_argument("--compare", metavar="PATH", help="Compare with a baseline.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Relative slowdown of the median reported as a regression.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        benchmarks = runner.registered(options["filter"])
+        if not benchmarks:
+            raise CommandError("No benchmarks match.")
+
+        results = {}
+        # Everything, including the seed data, is rolled back afterwards.
+        with transaction.atomic():
+            fixtures = recipes.seed(recipes=options["recipes"])
+            for name, factory in benchmarks.items():
+                stats = runner.measure(
+                    factory(fixtures),
+                    warmup=options["warmup"],
+                    repeats=options["repeats"],
+                    number=options["number"],
+                )
+                results[name] = stats
+                self.stdout.write(
+                    f"{name:<40} median {stats['median'] * 1e6:10.1f}us "
+                    f"± {stats['stdev'] * 1e6:8.1f}us  {stats['ops_per_sec']:10.1f} ops/s"
+                )
+            transaction.set_rollback(True)
+
+        if options["save"]:
+            runner.save_baseline(options["save"], results)
+            self.stdout.write(f"Saved baseline to {options['save']}.")
+        if options["compare"]:
+            self.compare(results, options["compare"], options["tolerance"])
+
+    def compare(self, results, path, tolerance):
+        rows = runner.compare(results, runner.load_baseline(path), tolerance)
+        regressions = [row for row in rows if row[3]]
+        for name, expected, change, regressed in rows:
+            line = f"{name:<40} baseline {expected * 1e6:10.1f}us  {change:+7.1%}"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} benchmark(s) slower than the baseline.")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
@@ -0,0 +1,178 @@
+"""
+Django command to prepare a container before the application server starts.
+"""
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+
+from core import sharding
+
+# Written to STATIC_ROOT after collectstatic, holding the static fingerprint.
+STATIC_STAMP = ".boot-static"
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+
+
+def wait_for_database(alias, timeout, connect_timeout, sleep=time.sleep):
+    """Connect to alias, retrying with exponential backoff until timeout.
+
+    Returns the number of attempts made.
+    """
+    connection = connections[alias]
+    # settings_dict is settings.DATABASES[alias] itself, so the timeout is
+    # removed again before later connections are made.
+    options = connection.settings_dict.get("OPTIONS", {})
+    if connection.vendor == "postgresql":
+        connection.settings_dict["OPTIONS"] = {**options, "connect_timeout": connect_timeout}
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    attempts = 1
+    try:
+        while True:
+            try:
+                connection.ensure_connection()
+                return attempts
+            except OperationalError:
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(f"Database {alias} unavailable after {timeout}s.")
+                sleep(delay)
+                delay = min(delay * 2, 5)
+                attempts += 1
+    finally:
+        connection.settings_dict["OPTIONS"] = options
+
+
+def static_fingerprint():
+    """Return a hash of the storage class and every file collectstatic would copy."""
+    digest = hashlib.sha256(settings.STATICFILES_STORAGE.encode())
+    for finder in get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            prefixed = os.path.join(getattr(storage, "prefix", None) or "", path)
+            digest.update(prefixed.encode() + b"\0")
+            with storage.open(path) as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def pending_migrations(alias):
+    """Return the migrations migrate would apply to alias."""
+    executor = MigrationExecutor(connections[alias])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+class Command(BaseCommand):
+    """Django command to wait for databases, collect static files and migrate."""
+
+    help = (
+        "Wait for the databases, then collect static files, migrate and write "
+        "the OpenAPI schema concurrently, skipping steps with nothing to do."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait for each database.",
+        )
+        parser.add_argument(
+            "--connect-timeout",
+            type=int,
+            default=3,
+            help="Seconds before a connection attempt is abandoned.",
+        )
+        parser.add_argument(
+            "--schema-file",
+            default=settings.OPENAPI_SCHEMA_FILE,
+            help="Write the OpenAPI schema here, defaults to OPENAPI_SCHEMA_FILE.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run collectstatic and migrate even when they look up to date.",
+        )
+
+    def step(self, name, func, *args):
+        """Run func, then report its outcome and duration."""
+        start = time.monotonic()
+        output = io.StringIO()
+        message = func(output, *args)
+        if self.verbosity > 1 and output.getvalue():
+            self.stdout.write(output.getvalue(), ending="")
+        self.stdout.write(f"{name}: {message} ({time.monotonic() - start:.2f}s)")
+
+    def collect_static(self, output, force):
+        fingerprint = static_fingerprint()
+        stamp = os.path.join(settings.STATIC_ROOT, STATIC_STAMP)
+        if not force and os.path.exists(stamp):
+            with open(stamp) as f:
+                if f.read() == fingerprint:
+                    return "unchanged, skipped"
+        call_command("collectstatic", interactive=False, verbosity=1, stdout=output)
+        os.makedirs(settings.STATIC_ROOT, exist_ok=True)
+        with open(stamp, "w") as f:
+            f.write(fingerprint)
+        return "collected"
+
+    def migrate(self, output, force):
+        # Shards carry the full schema; default goes first, as their ID
+        # sequences are configured from the other databases.
+        try:
+            migrated = []
+            for alias in dict.fromkeys(["default", *settings.DATABASE_SHARDS]):
+                if force or pending_migrations(alias):
+                    call_command(
+                        "migrate",
+                        database=alias,
+                        interactive=False,
+                        verbosity=1,
+                        stdout=output,
+                    )
+                    migrated.append(alias)
+            # A no-op unless the default cache is a database table.
+            call_command("createcachetable", database="default", stdout=output)
+            # Also after a shard was added to databases that were up to date.
+            resequenced = sharding.configure_id_sequences()
+        finally:
+            connections.close_all()
+        message = f"migrated {', '.join(migrated)}" if migrated else "up to date"
+        if resequenced:
+            message += ", shard ID sequences reconfigured"
+        return message
+
+    def write_schema(self, output, path):
+        call_command("spectacular", file=path, stdout=output)
+        return f"wrote {path}"
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.verbosity = options["verbosity"]
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            # Static files and the schema do not need the database.
+            futures = [
+                pool.submit(self.step, "collectstatic", self.collect_static, options["force"])
+            ]
+            if options["schema_file"]:
+                futures.append(
+                    pool.submit(self.step, "schema", self.write_schema, options["schema_file"])
+                )
+
+            for alias in dict.fromkeys(["default", *settings.DATABASE_SHARDS]):
+                attempts = wait_for_database(alias, options["timeout"], options["connect_timeout"])
+                self.stdout.write(f"database {alias}: available after {attempts} attempt(s)")
+            futures.append(pool.submit(self.step, "migrate", self.migrate, options["force"]))
+
+            for future in futures:
+                future.result()
+
+        self.stdout.write(self.style.SUCCESS(f"Booted in {time.monotonic() - start:.2f}s."))
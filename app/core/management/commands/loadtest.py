@@ -0,0 +1,136 @@
+"""
+Django command to load test the WSGI application in-process.
+"""
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.http.request import validate_host
+from rest_framework.authtoken.models import Token
+
+from benchmarks import loadtest
+from core.models import Recipe, Tag
+
+EMAIL = "loadtest-{}@example.com"
+PASSWORD = "loadtest-pass-123"
+
+
+class Command(BaseCommand):
+    """Django command to measure throughput and latency per endpoint."""
+
+    help = (
+        "Drive app.wsgi.application from a thread or process pool with a mix "
+        "of API requests and report throughput and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run.")
+        parser.add_argument("--requests", type=int, help="Stop after this many requests.")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}:{weight}" for name, weight in loadtest.DEFAULT_MIX.items()),
+            help="Weighted endpoints, e.g. recipe-list:3,token:1.",
+        )
+        parser.add_argument(
+            "--host",
+            default=(settings.ALLOWED_HOSTS or ["localhost"])[0].lstrip("."),
+            help="Host header to send, must be in ALLOWED_HOSTS.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help="Delete the load test users and their data afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(e)
+        allowed = settings.ALLOWED_HOSTS
+        if settings.DEBUG and not allowed:
+            allowed = [".localhost", "127.0.0.1", "[::1]"]
+        if not validate_host(options["host"], allowed):
+            self.stdout.write(self.style.WARNING(
+                f"{options['host']} is not in ALLOWED_HOSTS, requests will fail with 400."
+            ))
+
+        concurrency = options["concurrency"]
+        clients = [self.setup_client(i) for i in range(concurrency)]
+        per_worker = None
+        if options["requests"]:
+            per_worker = math.ceil(options["requests"] / concurrency)
+
+        self.stdout.write(f"Running {concurrency} {options['pool']} workers...")
+        start = time.monotonic()
+        deadline = start + options["duration"]
+        jobs = [
+            (options["host"], client, mix, deadline, per_worker, options["seed"] + i)
+            for i, client in enumerate(clients)
+        ]
+        if options["pool"] == "process":
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                concurrency,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+            with executor:
+                futures = [executor.submit(loadtest.run_process_worker, *job) for job in jobs]
+        else:
+            from app.wsgi import application
+
+            with ThreadPoolExecutor(concurrency) as executor:
+                futures = [executor.submit(loadtest.run_worker, application, *job) for job in jobs]
+        results = [result for future in futures for result in future.result()]
+        elapsed = time.monotonic() - start
+
+        self.report(loadtest.summarize(results, elapsed))
+        if options["cleanup"]:
+            get_user_model().objects.filter(pk__in=[c["user_id"] for c in clients]).delete()
+
+    def setup_client(self, index):
+        """Return credentials and object IDs for a load test user, creating it if needed."""
+        user, created = get_user_model().objects.get_or_create(email=EMAIL.format(index))
+        if created:
+            user.set_password(PASSWORD)
+            user.save()
+        token, _ = Token.objects.get_or_create(user=user)
+        for i in range(5 - Recipe.objects.filter(user=user).count()):
+            recipe = Recipe.objects.create(
+                user=user,
+                title=f"Seed recipe {i}",
+                time_minutes=10,
+                price=Decimal("5.00"),
+            )
+            recipe.tags.add(Tag.objects.get_or_create(user=user, name=f"Seed tag {i}")[0])
+        return {
+            "user_id": user.pk,
+            "email": user.email,
+            "password": PASSWORD,
+            "token": token.key,
+            "recipe_ids": list(Recipe.objects.filter(user=user).values_list("id", flat=True)),
+            "tag_ids": list(Tag.objects.filter(user=user).values_list("id", flat=True)),
+        }
+
+    def report(self, summary):
+        """Write a table of the summary with the total last."""
+        self.stdout.write(
+            f"{'endpoint':<22}{'requests':>9}{'errors':>8}{'req/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for name, row in sorted(summary.items(), key=lambda item: item[0] == "total"):
+            self.stdout.write(
+                f"{name:<22}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9.1f}"
+                f"{row['p50'] * 1000:>9.1f}{row['p95'] * 1000:>9.1f}{row['p99'] * 1000:>9.1f}"
+            )
@@ -0,0 +1,39 @@
+"""
+Django command to move a user's recipe data to another shard.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+
+
+class Command(BaseCommand):
+    """Django command to move a user between shards while online."""
+
+    help = "Move a user's recipes, tags and ingredients to another shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument("user_id", type=int)
+        parser.add_argument("shard", choices=settings.DATABASE_SHARDS)
+        parser.add_argument(
+            "--grace",
+            type=float,
+            default=2.0,
+            help="Seconds to let in-flight writes finish before copying.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user_id = options["user_id"]
+        if not sharding.User.objects.filter(pk=user_id).exists():
+            raise CommandError(f"User {user_id} does not exist.")
+
+        source = sharding.shard_for_user(user_id)
+        self.stdout.write(f"Moving user {user_id} from {source} to {options['shard']}...")
+        sharding.move_user(
+            user_id,
+            options["shard"],
+            grace=options["grace"],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS("User moved!"))
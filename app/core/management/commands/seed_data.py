@@ -0,0 +1,91 @@
+"""
+Django command to generate a synthetic data set for performance testing.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from benchmarks import dataset
+from core.models import User
+
+
+class Command(BaseCommand):
+    """Django command to bulk-load users, recipes, tags and ingredients."""
+
+    help = (
+        "Generate users with realistic recipes, tags and ingredients. The "
+        "same seed always generates the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--recipes-per-user",
+            type=int,
+            default=20,
+            help="Average recipes per user.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--image-ratio",
+            type=float,
+            default=0.3,
+            help="Share of recipes with a placeholder image.",
+        )
+        parser.add_argument(
+            "--method",
+            choices=["auto", "copy", "bulk"],
+            default="auto",
+            help="Load with COPY (PostgreSQL) or bulk_create; auto picks COPY if possible.",
+        )
+        parser.add_argument(
+            "--disable-triggers",
+            action="store_true",
+            help=(
+                "Skip foreign key checks while loading, like pg_restore "
+                "--disable-triggers. PostgreSQL superusers only."
+            ),
+        )
+        parser.add_argument(
+            "--batch-users",
+            type=int,
+            default=1000,
+            help="Users generated and committed per batch.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        generator = dataset.DatasetGenerator(
+            seed=options["seed"],
+            recipes_per_user=options["recipes_per_user"],
+            image_ratio=options["image_ratio"],
+            method=options["method"],
+        )
+        if User.objects.filter(email=generator.email(0)).exists():
+            raise CommandError(
+                f"Data for seed {options['seed']} already exists, use another --seed."
+            )
+        if options["image_ratio"]:
+            dataset.ensure_placeholder_image()
+
+        start = time.perf_counter()
+        aliases = {"default", *settings.DATABASE_SHARDS}
+        for first in range(0, options["users"], options["batch_users"]):
+            count = min(options["batch_users"], options["users"] - first)
+            with ExitStack() as stack:
+                for alias in aliases:
+                    stack.enter_context(transaction.atomic(using=alias))
+                    if options["disable_triggers"]:
+                        # Generated rows reference each other correctly by construction.
+                        with connections[alias].cursor() as cursor:
+                            cursor.execute("SET LOCAL session_replication_role = replica")
+                generator.generate(first, count)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{first + count} users, {generator.rows} rows, "
+                f"{generator.rows / elapsed:,.0f} rows/s"
+            )
+        self.stdout.write(self.style.SUCCESS("Data generated!"))
@@ -0,0 +1,281 @@
+"""
+Multi-process metrics in the Prometheus text exposition format.
+
+uWSGI runs several worker processes, so each process writes its samples to
+its own mmap-backed file in settings.METRICS_DIR and the metrics view adds
+up the files of all processes. Files of recycled workers are kept, so
+counters survive worker restarts. Recording is a no-op when METRICS_DIR is
+not set.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+_INITIAL_SIZE = 1024 * 1024
+_HEADER_SIZE = 8
+
+_registry = []
+_lock = threading.Lock()
+_store = None
+_store_key = None
+
+
+class MmapedDict:
+    """A dict of float values stored in a memory-mapped file.
+
+    The file starts with the number of bytes used, followed by entries of a
+    4 byte key length, the UTF-8 key padded to 8 bytes and a float64 value.
+    Readers only parse up to the used size, so they never see a partial
+    entry.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._positions = {}
+        self._used = struct.unpack_from("i", self._mmap, 0)[0]
+        if self._used == 0:
+            self._used = _HEADER_SIZE
+            struct.pack_into("i", self._mmap, 0, self._used)
+        for key, _, position in _read_entries(self._mmap, self._used):
+            self._positions[key] = position
+
+    def _init_value(self, key):
+        encoded = key.encode("utf-8")
+        padding = b" " * (8 - (len(encoded) + 4) % 8)
+        entry = struct.pack("i", len(encoded)) + encoded + padding + struct.pack("d", 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._mmap[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        struct.pack_into("i", self._mmap, 0, self._used)
+        self._positions[key] = self._used - 8
+
+    def inc(self, key, amount):
+        """Add amount to the value stored under key."""
+        if key not in self._positions:
+            self._init_value(key)
+        position = self._positions[key]
+        value = struct.unpack_from("d", self._mmap, position)[0]
+        struct.pack_into("d", self._mmap, position, value + amount)
+
+
+def _read_entries(data, used):
+    position = _HEADER_SIZE
+    while position < used:
+        length = struct.unpack_from("i", data, position)[0]
+        key_end = position + 4 + length
+        key = bytes(data[position + 4:key_end]).decode("utf-8")
+        position = key_end + (8 - (length + 4) % 8)
+        yield key, struct.unpack_from("d", data, position)[0], position
+        position += 8
+
+
+def _get_store():
+    """Return this process' store, opening a new file after a fork."""
+    global _store, _store_key
+    if not settings.METRICS_DIR:
+        return None
+    key = (os.getpid(), settings.METRICS_DIR)
+    if _store_key != key:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _store = MmapedDict(os.path.join(settings.METRICS_DIR, f"metrics_{key[0]}.db"))
+        _store_key = key
+    return _store
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+def _record(name, labels, amount):
+    with _lock:
+        store = _get_store()
+        if store is not None:
+            store.inc(_key(name, labels), amount)
+
+
+class Counter:
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        if settings.METRICS_DIR:
+            _record(self.name, labels, amount)
+
+
+class Histogram(Counter):
+    """Counts of observed values in cumulative buckets, plus their sum."""
+
+    type = "histogram"
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, documentation, labelnames, buckets=default_buckets):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_DIR:
+            return
+        bucket = next(le for le in self.buckets if value <= le)
+        _record(f"{self.name}_bucket", {**labels, "le": _format_value(bucket)}, 1)
+        _record(f"{self.name}_sum", labels, value)
+        _record(f"{self.name}_count", labels, 1)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def collect():
+    """Return the samples of all processes as {(name, labels): value}."""
+    samples = {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, "metrics_*.db")):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER_SIZE:
+            continue
+        used = struct.unpack_from("i", data, 0)[0]
+        for key, value, _ in _read_entries(data, used):
+            name, labels = json.loads(key)
+            sample = (name, tuple(tuple(label) for label in labels))
+            samples[sample] = samples.get(sample, 0.0) + value
+    return samples
+
+
+def generate_latest():
+    """Render the aggregated samples in the Prometheus text format."""
+    samples = collect()
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        names = {metric.name}
+        if metric.type == "histogram":
+            names = {f"{metric.name}_{suffix}" for suffix in ("bucket", "sum", "count")}
+            samples = _cumulate_buckets(metric, samples)
+        for (name, labels), value in sorted(samples.items()):
+            if name not in names:
+                continue
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {value!r}" if labels else f"{name} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def _cumulate_buckets(metric, samples):
+    """Turn per-bucket counts into the cumulative counts Prometheus expects."""
+    samples = dict(samples)
+    series = {}
+    for (name, labels), value in samples.items():
+        if name == f"{metric.name}_bucket":
+            other = tuple(label for label in labels if label[0] != "le")
+            series.setdefault(other, {})[dict(labels)["le"]] = value
+    for other, counts in series.items():
+        total = 0.0
+        for bucket in metric.buckets:
+            le = _format_value(bucket)
+            total += counts.get(le, 0.0)
+            samples[(f"{metric.name}_bucket", tuple(sorted(other + (("le", le),))))] = total
+    return samples
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by view and method.",
+    ["view", "method"],
+)
+RESPONSES = Counter(
+    "http_responses_total",
+    "Responses by view and status code.",
+    ["view", "status"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "Database queries by view.",
+    ["view"],
+)
+DB_TIME = Counter(
+    "db_query_duration_seconds_total",
+    "Time spent in database queries by view.",
+    ["view"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result.",
+    ["cache", "result"],
+)
+ALLOCATED_PEAK = Histogram(
+    "request_allocated_peak_bytes",
+    "Peak memory allocated by traced requests, by view.",
+    ["view"],
+    buckets=tuple(64 * 1024 * 4 ** i for i in range(7)),
+)
+ALLOCATION_SITES = Counter(
+    "request_allocation_site_bytes_total",
+    "Bytes still allocated at the end of traced requests, by view and source line.",
+    ["view", "site"],
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool, by database.",
+    ["database"],
+)
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time connections were checked out of the pool, by database.",
+    ["database"],
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a connection, by database.",
+    ["database"],
+)
+DB_POOL_CONNECTIONS = Counter(
+    "db_pool_connections_total",
+    "Pooled connections opened and closed, by database and event.",
+    ["database", "event"],
+)
+COMPRESSION_BYTES_IN = Counter(
+    "http_response_compression_input_bytes_total",
+    "Response bytes before compression, by view and encoding.",
+    ["view", "encoding"],
+)
+COMPRESSION_BYTES_OUT = Counter(
+    "http_response_compression_output_bytes_total",
+    "Response bytes after compression, by view and encoding.",
+    ["view", "encoding"],
+)
+COMPRESSION_CPU = Counter(
+    "http_response_compression_cpu_seconds_total",
+    "CPU time spent compressing responses, by view and encoding.",
+    ["view", "encoding"],
+)
+COMPRESSION_RATIO = Histogram(
+    "http_response_compression_ratio",
+    "Compressed size as a share of the original size, by view and encoding.",
+    ["view", "encoding"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0),
+)
@@ -0,0 +1,352 @@
+"""
+Middleware for the app.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from core import metrics as core_metrics
+from core import allocations, compression, profiling, slow_queries
+from core.instrumentation import RequestMetrics, current_metrics, sql_timer, view_label
+
+logger = logging.getLogger("core.requests")
+
+
+class RequestTimingMiddleware:
+    """Report where each request spends its time.
+
+    With REQUEST_TIMING, adds a Server-Timing header with query count, SQL,
+    serializer, render and total time, and logs the same figures tagged with
+    the DRF view and action. With METRICS_DIR, records latency, status and
+    database time per view in core.metrics. Without either Django drops the
+    middleware entirely.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING and not settings.METRICS_DIR:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = metrics.activate()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(sql_timer))
+                response = self.get_response(request)
+        finally:
+            RequestMetrics.deactivate(token)
+
+        end = time.perf_counter()
+        total = end - metrics.start
+        if metrics.render_start is not None:
+            metrics.render_time = end - metrics.render_start
+        if settings.METRICS_DIR:
+            self.record(request, response, metrics, total)
+        if settings.REQUEST_TIMING:
+            self.report(request, response, metrics, total)
+        return response
+
+    def record(self, request, response, metrics, total):
+        """Add the request to the multi-process metrics."""
+        view = metrics.view or "unresolved"
+        core_metrics.REQUEST_LATENCY.observe(total, view=view, method=request.method)
+        core_metrics.RESPONSES.inc(view=view, status=str(response.status_code))
+        core_metrics.DB_QUERIES.inc(metrics.query_count, view=view)
+        core_metrics.DB_TIME.inc(metrics.sql_time, view=view)
+
+    def report(self, request, response, metrics, total):
+        """Add the Server-Timing header and log the request."""
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.query_count} queries"',
+                f"serializer;dur={metrics.serializer_time * 1000:.2f}",
+                f"render;dur={metrics.render_time * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            ]
+        )
+        logger.info(
+            json.dumps(
+                {
+                    "view": metrics.view,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "queries": metrics.query_count,
+                    "db_ms": round(metrics.sql_time * 1000, 2),
+                    "serializer_ms": round(metrics.serializer_time * 1000, 2),
+                    "render_ms": round(metrics.render_time * 1000, 2),
+                    "total_ms": round(total * 1000, 2),
+                }
+            )
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.view = view_label(request, view_func)
+
+    def process_template_response(self, request, response):
+        metrics = current_metrics()
+        if metrics is not None:
+            # Django renders the response right after this hook.
+            metrics.render_start = time.perf_counter()
+        return response
+
+
+class SlowQueryMiddleware:
+    """Attribute slow queries to the view and action that ran them."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = slow_queries.set_view(None)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(slow_queries.log_slow_query)
+                    )
+                return self.get_response(request)
+        finally:
+            slow_queries.reset_view(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.set_view(view_label(request, view_func))
+
+
+class ProfilerMiddleware:
+    """Profile requests on demand and save their folded stacks.
+
+    A request is profiled when a staff user's token comes with an
+    "X-Profile: 1" header, or at random at PROFILER_SAMPLE_RATE. The profile
+    ID is returned in the X-Profile-Id header.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_OUTPUT_DIR:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if request.headers.get("X-Profile") == "1":
+            # DRF is imported here rather than at startup, see core.lazy.
+            from rest_framework.authentication import TokenAuthentication
+            from rest_framework.exceptions import AuthenticationFailed
+
+            try:
+                auth = TokenAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            return auth is not None and auth[0].is_staff
+        return random.random() < settings.PROFILER_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = profiling.Sampler(
+            threading.get_ident(),
+            settings.PROFILER_INTERVAL_MS / 1000,
+        )
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        profile_id = profiling.profile_id(request)
+        profiling.write_folded(
+            os.path.join(settings.PROFILER_OUTPUT_DIR, f"{profile_id}.folded"),
+            stacks,
+        )
+        profiling.prune(settings.PROFILER_OUTPUT_DIR, settings.PROFILER_MAX_FILES)
+        response["X-Profile-Id"] = profile_id
+        return response
+
+
+class AllocationTrackingMiddleware:
+    """Record peak allocations and top allocation sites of sampled requests.
+
+    A ALLOC_TRACKING_SAMPLE_RATE share of requests is traced with
+    tracemalloc and the results are added to the metrics in METRICS_DIR.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ALLOC_TRACKING_SAMPLE_RATE or not settings.METRICS_DIR:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.local = threading.local()
+
+    def __call__(self, request):
+        if random.random() >= settings.ALLOC_TRACKING_SAMPLE_RATE or not allocations.start():
+            return self.get_response(request)
+
+        self.local.view = "unresolved"
+        try:
+            return self.get_response(request)
+        finally:
+            peak, sites = allocations.stop(settings.ALLOC_TRACKING_TOP_SITES)
+            view = self.local.view
+            core_metrics.ALLOCATED_PEAK.observe(peak, view=view)
+            for site, size in sites:
+                core_metrics.ALLOCATION_SITES.inc(size, view=view, site=site)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.local.view = view_label(request, view_func)
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, as the client accepts.
+
+    Responses below COMPRESSION_MIN_SIZE bytes, already encoded, served by
+    the proxy through X-Accel-Redirect or of types that do not compress
+    (see core.compression) are sent as they are. Streaming responses are
+    compressed chunk by chunk. Sizes and CPU time are recorded per view and
+    encoding in core.metrics, and with REQUEST_TIMING added to Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_COMPRESSION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compression.should_compress(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.negotiate(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        compressor = compression.Compressor(encoding)
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                request, response.streaming_content, compressor
+            )
+            del response["Content-Length"]
+        else:
+            content = compressor.compress(response.content) + compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+            self.record(request, compressor)
+            if settings.REQUEST_TIMING:
+                self.report(response, compressor)
+
+        # The compressed body differs from the one a strong ETag names.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def compress_stream(self, request, chunks, compressor):
+        """Compress chunks as they come, so each reaches the client right away."""
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk, flush=True)
+        yield compressor.finish()
+        self.record(request, compressor)
+
+    def record(self, request, compressor):
+        """Add the response's sizes and CPU time to the metrics."""
+        match = request.resolver_match
+        view = view_label(request, match.func) if match else "unresolved"
+        labels = {"view": view, "encoding": compressor.encoding}
+        core_metrics.COMPRESSION_BYTES_IN.inc(compressor.bytes_in, **labels)
+        core_metrics.COMPRESSION_BYTES_OUT.inc(compressor.bytes_out, **labels)
+        core_metrics.COMPRESSION_CPU.inc(compressor.cpu_time, **labels)
+        core_metrics.COMPRESSION_RATIO.observe(compressor.ratio, **labels)
+
+    def report(self, response, compressor):
+        """Add the compression time and ratio to the Server-Timing header."""
+        timing = (
+            f"compress;dur={compressor.cpu_time * 1000:.2f};"
+            f'desc="{compressor.encoding} {compressor.ratio:.2f}"'
+        )
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+
+
+class PathScopedMiddleware:
+    """Run BROWSER_MIDDLEWARE only for requests that may use it.
+
+    Session, CSRF, authentication and message middleware serve the admin;
+    the token authenticated API under BROWSER_MIDDLEWARE_EXEMPT_PATHS never
+    reads sessions or messages and skips them. For other requests they run
+    in order, as if listed in MIDDLEWARE here, with their process_view,
+    process_template_response and process_exception hooks called from this
+    middleware's hooks.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.exempt_paths = tuple(settings.BROWSER_MIDDLEWARE_EXEMPT_PATHS)
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+
+        # Built the way Django's BaseHandler.load_middleware builds MIDDLEWARE.
+        handler = get_response
+        for path in reversed(settings.BROWSER_MIDDLEWARE):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, "process_view"):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, "process_template_response"):
+                self.template_response_hooks.append(middleware.process_template_response)
+            if hasattr(middleware, "process_exception"):
+                self.exception_hooks.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.browser_handler = handler
+
+    def is_exempt(self, request):
+        return request.path_info.startswith(self.exempt_paths)
+
+    def __call__(self, request):
+        if self.is_exempt(request):
+            return self.get_response(request)
+        return self.browser_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.is_exempt(request):
+            for hook in self.view_hooks:
+                response = hook(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not self.is_exempt(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if not self.is_exempt(request):
+            for hook in self.exception_hooks:
+                response = hook(request, exception)
+                if response is not None:
+                    return response
+        return None
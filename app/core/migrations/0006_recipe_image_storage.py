@@ -0,0 +1,20 @@
+# Generated by Django 4.0.10 on 2026-10-19 02:15
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.get_recipe_image_storage, upload_to=core.models.recipe_image_file_path),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def backfill_user_shards(apps, schema_editor):
+    """Record "default" for users created before every user had an entry."""
+    if schema_editor.connection.alias != "default":
+        return
+    User = apps.get_model("core", "User")
+    UserShard = apps.get_model("core", "UserShard")
+    missing = User.objects.filter(usershard__isnull=True).values_list("id", flat=True)
+    UserShard.objects.bulk_create(
+        (UserShard(user_id=user_id, shard="default") for user_id in missing.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_shards'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_shards, migrations.RunPython.noop),
+    ]
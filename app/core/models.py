@@ -12,6 +12,8 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 
+from core.storage import get_recipe_image_storage
+
 # Create your models here.
 
 
@@ -62,9 +64,12 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Recipe(models.Model):
     """Recipe object."""
 
+    # Recipes may live on a different shard than the users table, so the
+    # foreign key is enforced by Django rather than by the database.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -73,7 +78,11 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=get_recipe_image_storage,
+    )
 
     """
     blank=True 主要與表單驗證有關，而不是數據庫約束。
@@ -92,6 +101,7 @@ class Tag(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
 
     def __str__(self):
@@ -105,7 +115,23 @@ class Ingredient(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
 
     def __str__(self):
         return self.name
+
+
+class UserShard(models.Model):
+    """Database shard holding a user's recipes, tags and ingredients."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    shard = models.CharField(max_length=64)
+    moving = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.shard}"
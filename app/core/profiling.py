@@ -0,0 +1,86 @@
+"""
+Statistical profiler for individual requests.
+
+A background thread samples the stack of the thread handling the request
+and counts identical stacks. The counts are written in the folded format
+read by flamegraph.pl, speedscope and similar tools.
+"""
+import collections
+import os
+import re
+import sys
+import threading
+import uuid
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _frame_label(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class Sampler:
+    """Sample the stack of one thread every interval seconds."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the counts per folded stack."""
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+
+def profile_id(request):
+    """Return a unique profile ID, prefixed with the proxy's request ID when safe.
+
+    The request ID comes from the client side, so a random suffix keeps
+    repeated or forged IDs from overwriting each other's profiles.
+    """
+    suffix = uuid.uuid4().hex
+    value = request.headers.get("X-Request-ID", "")
+    return f"{value}-{suffix[:12]}" if _REQUEST_ID.match(value) else suffix
+
+
+def write_folded(path, stacks):
+    """Write stack counts to path, one "frame;frame;frame count" line per stack."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def prune(directory, max_files):
+    """Delete the oldest profiles in directory beyond the newest max_files."""
+    paths = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".folded"):
+            try:
+                paths.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    paths.sort(reverse=True)
+    for _, path in paths[max_files:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another worker pruned it first.
+            pass
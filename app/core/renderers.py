@@ -0,0 +1,115 @@
+"""
+Renderers and parsers for the REST API.
+
+JSON is rendered and parsed with orjson, when it is installed. MessagePack
+is offered to clients that ask for it, see MessagePackRenderer.
+
+
+Output is byte for byte what DRF's JSONRenderer produces with the default
+settings. Anything orjson cannot reproduce (indented or ASCII-only output,
+integers beyond 64 bits) is handed to the stdlib implementation. Two known
+differences remain, neither reachable from this API's serializers: floats
+in exponent notation are written 1e-7 rather than 1e-07, and NaN or
+infinite floats render as null instead of raising.
+"""
+import io
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for compact UTF-8 output."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if orjson is None or self.ensure_ascii or not self.compact or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Types DRF's encoder formats differently from orjson go to its default().
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=options | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, so the output is valid JavaScript.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser using orjson, with the stdlib deciding on what it rejects."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        data = stream.read()
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        try:
+            if encoding.lower().replace("_", "-") in ("utf-8", "utf8"):
+                return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+        # Other encodings, and input orjson refuses, get DRF's behaviour and
+        # error messages.
+        return super().parse(io.BytesIO(data), media_type, parser_context)
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError("MessagePack support needs the msgpack package.")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render MessagePack for clients sending "Accept: application/msgpack".
+
+    Values are the ones JSONRenderer would write: types MessagePack has no
+    encoding for, such as Decimal or datetime, are converted by DRF's JSON
+    encoder.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        _require_msgpack()
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parse request bodies sent with "Content-Type: application/msgpack"."""
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        _require_msgpack()
+        try:
+            # Container sizes are bounded by the length of the body.
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
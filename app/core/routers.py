@@ -0,0 +1,191 @@
+"""
+Database routers.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from core import metrics, sharding
+
+PIN_COOKIE = "db_pin"
+
+_read_replica = contextvars.ContextVar("read_replica", default=False)
+_current_shard = contextvars.ContextVar("current_shard", default=None)
+
+
+def choose_replica(primary="default"):
+    """Return a replica alias for primary, or None if it has none."""
+    replicas = settings.DATABASE_REPLICAS.get(primary)
+    if not replicas:
+        return None
+    return random.choice(replicas)
+
+
+def replicas_configured():
+    """Return True if any database has read replicas."""
+    return any(settings.DATABASE_REPLICAS.values())
+
+
+def _pin_cache_key(user):
+    return f"db-pin:{user.pk}"
+
+
+def pin_to_primary(request, response):
+    """Send the user's reads to the primary for DB_REPLICA_PIN_SECONDS.
+
+    The pin is stored in a signed cookie, which every worker can check
+    without a lookup, and with DB_REPLICA_PIN_CACHE also in the cache for
+    clients that drop cookies.
+    """
+    seconds = settings.DB_REPLICA_PIN_SECONDS
+    if settings.DB_REPLICA_PIN_CACHE:
+        cache.set(_pin_cache_key(request.user), True, seconds)
+    response.set_signed_cookie(
+        PIN_COOKIE,
+        str(request.user.pk),
+        salt=PIN_COOKIE,
+        max_age=seconds,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def is_pinned(request):
+    """Return True if the user wrote recently and must read from the primary."""
+    try:
+        user_id = request.get_signed_cookie(
+            PIN_COOKIE,
+            salt=PIN_COOKIE,
+            max_age=settings.DB_REPLICA_PIN_SECONDS,
+        )
+    except (KeyError, signing.BadSignature):
+        user_id = None
+    if user_id == str(request.user.pk):
+        return True
+    if not settings.DB_REPLICA_PIN_CACHE:
+        return False
+    pinned = bool(cache.get(_pin_cache_key(request.user)))
+    metrics.CACHE_REQUESTS.inc(cache="replica_pin", result="hit" if pinned else "miss")
+    return pinned
+
+
+class ReplicaReadMixin:
+    """Send list and retrieve queries to a replica unless the user just wrote.
+
+    Successful writes pin the user to the primary so they read their own
+    changes while replication catches up. Without replicas there is nothing
+    to pin, and the pin lookups are skipped.
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _read_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        replica_action = self.action in self.replica_actions and replicas_configured()
+        if replica_action and not is_pinned(request):
+            _read_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        wrote = request.method not in SAFE_METHODS and response.status_code < 400
+        if wrote and request.user.is_authenticated and replicas_configured():
+            pin_to_primary(request, response)
+        return response
+
+
+class ShardRoutingMixin:
+    """Route the authenticated user's recipe data to their shard."""
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _current_shard.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _current_shard.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            shard = sharding.shard_for_user(
+                request.user.pk,
+                for_write=request.method not in SAFE_METHODS,
+            )
+            _current_shard.set(shard)
+
+
+class ShardRouter:
+    """Route sharded models to the shard of the user they belong to."""
+
+    def _shard(self, model, hints):
+        if not sharding.is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            if sharding.is_sharded(type(instance)) and instance._state.db:
+                return instance._state.db
+            if isinstance(instance, sharding.User):
+                return sharding.shard_for_user(instance.pk)
+        return _current_shard.get()
+
+    def db_for_read(self, model, **hints):
+        shard = self._shard(model, hints)
+        if shard is not None and _read_replica.get():
+            return choose_replica(shard) or shard
+        return shard
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users live on the default database and own rows on every shard.
+        sharded = [sharding.is_sharded(type(obj)) for obj in (obj1, obj2)]
+        if any(sharded) and not all(sharded):
+            return True
+        return None
+
+    # No allow_migrate: shards carry the full schema so historical migrations
+    # apply unchanged, but only sharded tables ever receive rows.
+
+
+class ReplicaRouter:
+    """Route reads of core models to replicas inside replica-safe views."""
+
+    route_app_labels = {"core"}
+
+    def _replica_aliases(self):
+        return {alias for aliases in settings.DATABASE_REPLICAS.values() for alias in aliases}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        if not _read_replica.get():
+            return "default"
+        return choose_replica() or "default"
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        # Never fall back to the instance's database, it may be a replica.
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default"} | self._replica_aliases()
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self._replica_aliases():
+            return False
+        return None
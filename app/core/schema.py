@@ -0,0 +1,78 @@
+"""
+Cached OpenAPI schema view.
+
+Kept out of core.views so drf_spectacular and yaml are only imported when
+the schema route is first requested.
+"""
+import hashlib
+import threading
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.views import SpectacularAPIView
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """Serve the OpenAPI schema from memory instead of regenerating it per request.
+
+    The schema is read from OPENAPI_SCHEMA_FILE when that is set, otherwise
+    generated on the first request. Each format is rendered once and
+    served with an ETag, so unchanged schemas cost a 304. CompressionMiddleware
+    compresses it for clients that accept it.
+    """
+
+    _lock = threading.Lock()
+    _schemas = {}
+    _rendered = {}
+
+    def _get_schema(self, request, version):
+        key = (version, request.GET.get("lang"))
+        if key not in self._schemas:
+            if key == (None, None) and settings.OPENAPI_SCHEMA_FILE:
+                with open(settings.OPENAPI_SCHEMA_FILE) as f:
+                    schema = yaml.safe_load(f)
+            else:
+                generator = self.generator_class(
+                    urlconf=self.urlconf,
+                    api_version=version,
+                    patterns=self.patterns,
+                )
+                schema = generator.get_schema(request=request, public=self.serve_public)
+            self._schemas[key] = schema
+        return self._schemas[key]
+
+    def _render(self, request, version):
+        renderer = request.accepted_renderer
+        key = (version, request.GET.get("lang"), renderer.media_type)
+        with self._lock:
+            if key not in self._rendered:
+                body = renderer.render(
+                    self._get_schema(request, version),
+                    renderer_context=self.get_renderer_context(),
+                )
+                self._rendered[key] = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            return self._rendered[key]
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        body, etag = self._render(request, version)
+
+        # Compressed responses carry the weak form of the ETag.
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in {tag.removeprefix("W/") for tag in etags}:
+            response = HttpResponseNotModified()
+        else:
+            content_type = request.accepted_renderer.media_type
+            if request.accepted_renderer.charset:
+                content_type += f"; charset={request.accepted_renderer.charset}"
+            response = HttpResponse(body, content_type=content_type)
+            response["Content-Disposition"] = (
+                f'inline; filename="{self._get_filename(request, version)}"'
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=60"
+        patch_vary_headers(response, ["Accept"])
+        return response
@@ -0,0 +1,218 @@
+"""
+User-based sharding of recipe data.
+
+Recipes, tags, ingredients and their through tables are stored on one of
+settings.DATABASE_SHARDS, chosen per user. Users, tokens and the shard
+directory stay on the default database. Every user's shard is recorded when
+the user is created, also with a single shard, so existing users stay put
+when shards are added. With a single shard lookups short-circuit to
+"default" without touching the directory.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models.signals import post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core import metrics
+from core.models import Ingredient, Recipe, Tag, User, UserShard
+
+SHARDED_MODELS = (Tag, Ingredient, Recipe, Recipe.tags.through, Recipe.ingredients.through)
+
+
+class ShardMoving(APIException):
+    """Raised when writing data of a user that is being moved between shards."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Your data is being moved, please retry shortly."
+    default_code = "shard_moving"
+
+
+def is_sharded(model):
+    """Return True if instances of model are stored on user shards."""
+    return model in SHARDED_MODELS
+
+
+def _cache_key(user_id):
+    return f"user-shard:{user_id}"
+
+
+def assign_shard(user_id):
+    """Return the shard a new user is placed on."""
+    shards = settings.DATABASE_SHARDS
+    return shards[user_id % len(shards)]
+
+
+def shard_for_user(user_id, for_write=False):
+    """Return the database alias holding the data of user_id.
+
+    Users without a directory entry were created before it existed, or in
+    bulk, and their data is on "default". Writes bypass the cache so a move
+    is never raced by a stale entry.
+    """
+    shards = settings.DATABASE_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+
+    if not for_write:
+        shard = cache.get(_cache_key(user_id))
+        result = "miss" if shard is None else "hit"
+        metrics.CACHE_REQUESTS.inc(cache="shard_directory", result=result)
+        if shard is not None:
+            return shard
+
+    entry, _ = UserShard.objects.using("default").get_or_create(
+        user_id=user_id,
+        defaults={"shard": "default"},
+    )
+    if for_write and entry.moving:
+        raise ShardMoving()
+    cache.set(_cache_key(user_id), entry.shard, settings.SHARD_DIRECTORY_CACHE_SECONDS)
+    return entry.shard
+
+
+def move_user(user_id, target, grace=0, stdout=None):
+    """Copy a user's data to target, switch the directory, then delete the old copy.
+
+    Reads keep working from the old shard during the copy. Writes fail with
+    ShardMoving until the directory points at the new shard; grace gives
+    writes that started before the move time to commit. The old copy is
+    kept until cached directory entries pointing at it have expired.
+    """
+    source = shard_for_user(user_id, for_write=True)
+    if source == target:
+        return source
+
+    UserShard.objects.using("default").filter(user_id=user_id).update(moving=True)
+    cache.delete(_cache_key(user_id))
+    time.sleep(grace)
+    try:
+        with transaction.atomic(using=target):
+            for model, lookup in (
+                (Tag, "user_id"),
+                (Ingredient, "user_id"),
+                (Recipe, "user_id"),
+                (Recipe.tags.through, "recipe__user_id"),
+                (Recipe.ingredients.through, "recipe__user_id"),
+            ):
+                rows = list(model.objects.using(source).filter(**{lookup: user_id}))
+                model.objects.using(target).bulk_create(rows, batch_size=1000)
+                if stdout is not None:
+                    stdout.write(f"Copied {len(rows)} {model._meta.label} rows.")
+    except Exception:
+        UserShard.objects.using("default").filter(user_id=user_id).update(moving=False)
+        raise
+
+    UserShard.objects.using("default").filter(user_id=user_id).update(
+        shard=target,
+        moving=False,
+    )
+    cache.delete(_cache_key(user_id))
+    time.sleep(settings.SHARD_DIRECTORY_CACHE_SECONDS)
+    delete_user_data(user_id, source)
+    return target
+
+
+def delete_user_data(user_id, shard):
+    """Delete the recipes, tags and ingredients of user_id on shard."""
+    with transaction.atomic(using=shard):
+        Recipe.objects.using(shard).filter(user_id=user_id).delete()
+        Tag.objects.using(shard).filter(user_id=user_id).delete()
+        Ingredient.objects.using(shard).filter(user_id=user_id).delete()
+
+
+@receiver(post_save, sender=User)
+def record_shard(sender, instance, created, raw, **kwargs):
+    """Record the shard of a new user in the directory."""
+    if created and not raw:
+        UserShard.objects.using("default").create(
+            user_id=instance.pk,
+            shard=assign_shard(instance.pk),
+        )
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_data(sender, instance, using, **kwargs):
+    """Delete a user's data on other shards, the collector only covers one."""
+    if len(settings.DATABASE_SHARDS) == 1:
+        return
+    shard = shard_for_user(instance.pk)
+    if shard != using:
+        delete_user_data(instance.pk, shard)
+
+
+def _sequence(cursor, table):
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    return cursor.fetchone()[0]
+
+
+def id_sequences_configured():
+    """Return True if every shard's sequences step by the number of shards."""
+    shards = settings.DATABASE_SHARDS
+    for shard in shards:
+        with connections[shard].cursor() as cursor:
+            for model in SHARDED_MODELS:
+                sequence = _sequence(cursor, model._meta.db_table)
+                cursor.execute(
+                    "SELECT seqincrement FROM pg_sequence WHERE seqrelid = %s::regclass",
+                    [sequence],
+                )
+                if cursor.fetchone()[0] != len(shards):
+                    return False
+    return True
+
+
+def configure_id_sequences(force=False):
+    """Interleave ID sequences so primary keys are unique across shards.
+
+    Shard i hands out IDs congruent to i + 1 modulo the number of shards,
+    starting above the highest ID on any shard, so rows can be copied
+    between shards without renumbering. When the number of shards changed,
+    every shard is re-sequenced, with writes to the sharded tables locked
+    out meanwhile. Errors reaching a shard are raised, never skipped.
+    Returns whether the sequences were changed.
+    """
+    shards = settings.DATABASE_SHARDS
+    if len(shards) == 1 or connections["default"].vendor != "postgresql":
+        return False
+    if not force and id_sequences_configured():
+        return False
+
+    tables = [model._meta.db_table for model in SHARDED_MODELS]
+    with ExitStack() as stack:
+        for shard in shards:
+            stack.enter_context(transaction.atomic(using=shard))
+            with connections[shard].cursor() as cursor:
+                locked = ", ".join(f'"{table}"' for table in tables)
+                cursor.execute(f"LOCK TABLE {locked} IN EXCLUSIVE MODE")
+
+        for table in tables:
+            floor = 0
+            for shard in shards:
+                with connections[shard].cursor() as cursor:
+                    cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"')
+                    floor = max(floor, cursor.fetchone()[0])
+            base = floor + len(shards) - floor % len(shards)
+            for index, shard in enumerate(shards):
+                with connections[shard].cursor() as cursor:
+                    sequence = _sequence(cursor, table)
+                    cursor.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY {len(shards)}")
+                    cursor.execute("SELECT setval(%s, %s, false)", [sequence, base + index + 1])
+    return True
+
+
+@receiver(post_migrate)
+def configure_id_sequences_after_migrate(sender, using, **kwargs):
+    """Configure the sequences once the last shard has been migrated.
+
+    "manage.py boot" also configures them on every start, as it skips
+    migrate on databases that are up to date.
+    """
+    shards = settings.DATABASE_SHARDS
+    if sender.label == "core" and len(shards) > 1 and using == shards[-1]:
+        configure_id_sequences()
@@ -0,0 +1,113 @@
+"""
+Slow-query log with EXPLAIN plans.
+
+Queries slower than settings.SLOW_QUERY_THRESHOLD_MS are logged to the
+"core.slow_queries" logger together with the view that ran them and, for
+SELECTs on PostgreSQL, their estimated plan. SlowQueryMiddleware wraps the
+connections for the duration of each request. Logging is sampled and rate
+limited so a burst of slow queries does not add to the load.
+"""
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger("core.slow_queries")
+
+_current_view = contextvars.ContextVar("slow_query_view", default=None)
+_explaining = contextvars.ContextVar("slow_query_explaining", default=False)
+
+
+class TokenBucket:
+    """Allow up to capacity events at once, refilled at rate per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self):
+        """Take a token, return False if none is left."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+_bucket = None
+
+
+def _get_bucket():
+    global _bucket
+    per_minute = settings.SLOW_QUERY_MAX_PER_MINUTE
+    if _bucket is None or _bucket.capacity != per_minute:
+        _bucket = TokenBucket(per_minute / 60, per_minute)
+    return _bucket
+
+
+def set_view(label):
+    """Attribute queries of the current request to the view label."""
+    return _current_view.set(label)
+
+
+def reset_view(token):
+    _current_view.reset(token)
+
+
+def explain(connection, sql, params):
+    """Return the estimated plan of a SELECT as parsed JSON, or None."""
+    if connection.vendor != "postgresql" or not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    token = _explaining.set(True)
+    try:
+        # A savepoint keeps a failing EXPLAIN from breaking the caller's transaction.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (ANALYZE off, FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+    except Exception:
+        logger.debug("Could not explain slow query.", exc_info=True)
+        return None
+    finally:
+        _explaining.reset(token)
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def log_slow_query(execute, sql, params, many, context):
+    """Database execute wrapper logging queries over the threshold."""
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - start) * 1000
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if not threshold or duration < threshold:
+        return result
+    if random.random() >= settings.SLOW_QUERY_SAMPLE_RATE or not _get_bucket().consume():
+        return result
+
+    connection = context["connection"]
+    logger.warning(
+        json.dumps(
+            {
+                "view": _current_view.get(),
+                "database": connection.alias,
+                "duration_ms": round(duration, 2),
+                "sql": sql,
+                "plan": None if many else explain(connection, sql, params),
+            }
+        )
+    )
+    return result
@@ -0,0 +1,126 @@
+"""
+Storage backends for the app.
+"""
+import gzip
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_recipe_image_storage():
+    """Return the storage backend configured for recipe images."""
+    return import_string(settings.RECIPE_IMAGE_STORAGE)()
+
+
+class LocalObjectStorage(FileSystemStorage):
+    """Filesystem stand-in for an object store with pre-signed uploads.
+
+    Object store backends expose ``generate_upload_url`` so clients can send
+    image bytes straight to the store instead of through a uWSGI worker.
+    This backend signs the same kind of URL and accepts the upload on
+    ``core.views.storage_upload``, so the flow can be exercised offline.
+    """
+
+    upload_salt = "core.storage.upload"
+
+    def generate_upload_url(self, name, content_type, expires_in):
+        """Return the URL, method and headers a client uses to upload name."""
+        token = signing.dumps(
+            {
+                "name": name,
+                "content_type": content_type,
+                "expires": int(time.time()) + expires_in,
+            },
+            salt=self.upload_salt,
+        )
+        return {
+            "url": reverse("storage-upload", args=[token]),
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+    def load_upload_token(self, token):
+        """Return the upload described by token, or raise BadSignature."""
+        upload = signing.loads(token, salt=self.upload_salt)
+        if time.time() > upload["expires"]:
+            raise signing.SignatureExpired("Upload URL has expired.")
+        return upload
+
+
+def compress_file(path, min_size=256):
+    """Write .gz and, with brotli installed, .br siblings of path.
+
+    Files below min_size, or that compress by less than 5%, are left alone.
+    Returns the paths written.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < min_size:
+        return []
+
+    encoders = [(".gz", lambda content: gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda content: brotli.compress(content, quality=11)))
+    written = []
+    for suffix, encode in encoders:
+        compressed = encode(data)
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files with pre-compressed siblings for nginx's gzip_static.
+
+    After collectstatic has hashed the files, the hashed copy of every text
+    asset is compressed at the highest levels once, in a process per core.
+    Without a manifest, e.g. in tests or before the first collectstatic,
+    URLs use the unhashed names.
+    """
+
+    compress_extensions = (
+        ".css", ".js", ".map", ".json", ".svg", ".txt", ".html", ".xml",
+        ".ico", ".ttf", ".otf", ".eot",
+    )
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            hashed_names.add(hashed_name)
+        if dry_run:
+            return
+
+        # Templates only link the hashed names, so the originals are skipped.
+        paths = [
+            self.path(name)
+            for name in sorted(filter(None, hashed_names))
+            if name.endswith(self.compress_extensions)
+        ]
+        # Spawned, not forked: collectstatic may run next to other threads,
+        # e.g. in boot, and a forked child could inherit a lock they hold.
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            list(pool.map(compress_file, paths, chunksize=4))
@@ -0,0 +1,62 @@
+"""
+Tests for per-request allocation tracking.
+"""
+import tempfile
+import tracemalloc
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import allocations, metrics
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class AllocationTrackingTests(TestCase):
+    """Test allocation tracking and reporting."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(METRICS_DIR=self.tmp.name, ALLOC_TRACKING_SAMPLE_RATE=1.0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_one_trace_at_a_time(self):
+        """Test a second request is not traced while one is."""
+        self.assertTrue(allocations.start())
+        try:
+            self.assertFalse(allocations.start())
+        finally:
+            peak, sites = allocations.stop(limit=3)
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreaterEqual(peak, 0)
+        self.assertLessEqual(len(sites), 3)
+
+    def test_traced_requests_reported(self):
+        """Test traced requests are exported and summarised per view."""
+        user = get_user_model().objects.create_user(email="user@example.com", password="pass123")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        client.get(RECIPES_URL)
+        out = StringIO()
+        call_command("alloc_report", stdout=out)
+
+        samples = metrics.collect()
+        count = samples[("request_allocated_peak_bytes_count", (("view", "RecipeViewSet.list"),))]
+        self.assertEqual(count, 1.0)
+        self.assertIn("RecipeViewSet.list: 1 traced, mean peak", out.getvalue())
+
+    def test_report_requires_metrics_dir(self):
+        """Test the report fails clearly without a metrics directory."""
+        with override_settings(METRICS_DIR=""):
+            with self.assertRaises(CommandError):
+                call_command("alloc_report")
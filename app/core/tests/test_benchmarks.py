@@ -0,0 +1,63 @@
+"""
+Tests for the benchmark runner and command.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks import runner
+from core.models import Recipe
+
+
+class RunnerTests(SimpleTestCase):
+    """Test measuring and comparing benchmarks."""
+
+    def test_measure(self):
+        """Test warmup and timed calls and the reported statistics."""
+        calls = []
+
+        stats = runner.measure(lambda: calls.append(1), warmup=1, repeats=3, number=4)
+
+        self.assertEqual(len(calls), 16)
+        self.assertLessEqual(stats["min"], stats["median"])
+        self.assertGreater(stats["ops_per_sec"], 0)
+
+    def test_compare(self):
+        """Test slowdowns beyond the tolerance are flagged."""
+        baseline = {"fast": {"median": 1.0}, "slow": {"median": 1.0}}
+        results = {"fast": {"median": 1.05}, "slow": {"median": 1.5}, "new": {"median": 1.0}}
+
+        rows = runner.compare(results, baseline, tolerance=0.2)
+
+        flags = {name: regressed for name, _, _, regressed in rows}
+        self.assertEqual(flags, {"fast": False, "slow": True})
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test the benchmark command."""
+
+    def test_run_save_and_compare(self):
+        """Test all benchmarks run, seed data is rolled back and baselines round-trip."""
+        options = {"warmup": 0, "repeats": 1, "number": 1, "recipes": 5}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            out = StringIO()
+
+            call_command("benchmark", save=path, stdout=out, **options)
+            with open(path) as f:
+                baseline = json.load(f)
+
+            self.assertEqual(set(baseline), set(runner.registered()))
+            self.assertFalse(Recipe.objects.exists())
+
+            for stats in baseline.values():
+                stats["median"] /= 1000
+            with open(path, "w") as f:
+                json.dump(baseline, f)
+            with self.assertRaises(CommandError):
+                call_command("benchmark", compare=path, stdout=out, **options)
@@ -1,13 +1,20 @@
 """
 Test custom Django management commands.
 """
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.management.commands.boot import wait_for_database
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -33,3 +40,92 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class BootCommandTests(TestCase):
+    """Test the boot command."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, "source")
+        os.mkdir(self.source)
+        with open(os.path.join(self.source, "app.css"), "w") as f:
+            f.write("body {}")
+        settings = override_settings(
+            STATIC_ROOT=os.path.join(self.tmp.name, "static"),
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def boot(self, *args):
+        """Run boot and return its output."""
+        out = StringIO()
+        call_command("boot", *args, schema_file="", stdout=out)
+        return out.getvalue()
+
+    def test_boot_skips_up_to_date_steps(self):
+        """Test a second boot skips collectstatic and migrate."""
+        first = self.boot()
+        second = self.boot()
+
+        self.assertIn("collectstatic: collected", first)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "static", "app.css")))
+        self.assertIn("collectstatic: unchanged, skipped", second)
+        self.assertIn("migrate: up to date", second)
+
+    def test_boot_collects_changed_static(self):
+        """Test changed static files are collected again."""
+        self.boot()
+        source = os.path.join(self.source, "app.css")
+        with open(source, "w") as f:
+            f.write("body { color: red; }")
+        # collectstatic only copies files newer than the collected ones.
+        mtime = os.path.getmtime(source) + 10
+        os.utime(source, (mtime, mtime))
+
+        self.assertIn("collectstatic: collected", self.boot())
+        with open(os.path.join(self.tmp.name, "static", "app.css")) as f:
+            self.assertEqual(f.read(), "body { color: red; }")
+
+    @patch("core.management.commands.boot.call_command")
+    @patch("core.management.commands.boot.pending_migrations", return_value=["0001"])
+    def test_boot_migrates_pending(self, patched_pending, patched_call):
+        """Test migrate runs when migrations are pending."""
+        out = self.boot()
+
+        self.assertIn("migrate: migrated default", out)
+        migrate_calls = [c for c in patched_call.call_args_list if c.args == ("migrate",)]
+        self.assertEqual(len(migrate_calls), 1)
+        self.assertEqual(migrate_calls[0].kwargs["database"], "default")
+
+    @patch("django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection")
+    def test_wait_for_database_backoff(self, patched_connect):
+        """Test the database is polled with exponential backoff."""
+        patched_connect.side_effect = [OperationalError] * 3 + [None]
+        sleeps = []
+
+        attempts = wait_for_database("default", 10, 1, sleep=sleeps.append)
+
+        self.assertEqual(attempts, 4)
+        self.assertEqual(sleeps, [0.1, 0.2, 0.4])
+
+    @patch("django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection")
+    def test_wait_for_database_timeout(self, patched_connect):
+        """Test waiting gives up after the timeout."""
+        patched_connect.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            wait_for_database("default", 0, 1, sleep=lambda delay: None)
+
+    @patch("django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection")
+    def test_wait_for_database_restores_options(self, patched_connect):
+        """Test the connect timeout does not outlive the wait."""
+        options = dict(settings.DATABASES["default"].get("OPTIONS", {}))
+        patched_connect.side_effect = [OperationalError, None]
+
+        wait_for_database("default", 10, 7, sleep=lambda delay: None)
+
+        self.assertEqual(settings.DATABASES["default"].get("OPTIONS", {}), options)
@@ -0,0 +1,174 @@
+"""
+Tests for the database backend and connection pool.
+"""
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import metrics
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Minimal DB-API connection for pool tests."""
+
+    def __init__(self, usable=True):
+        self.closed = False
+        self.usable = usable
+        self.rollbacks = 0
+        self.hang = None
+        self.checking = threading.Event()
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql):
+                conn.checking.set()
+                if conn.hang is not None:
+                    conn.hang.wait(5)
+                if not conn.usable:
+                    raise RuntimeError("server closed the connection")
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the worker-local connection pool."""
+
+    def test_connection_reused(self):
+        """Test released connections are handed out again."""
+        pool = ConnectionPool(max_size=2)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(pool.stats()["connections_created"], 1)
+
+    def test_pool_timeout(self):
+        """Test acquiring from an exhausted pool times out."""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting thread receives a connection once released."""
+        pool = ConnectionPool(max_size=1, timeout=5)
+        conn = pool.acquire(FakeConnection)
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(FakeConnection)))
+        waiter.start()
+
+        pool.release(conn)
+        waiter.join(5)
+
+        self.assertEqual(acquired, [conn])
+        self.assertGreater(pool.stats()["wait_seconds_total"], 0)
+
+    def test_expired_connection_recycled(self):
+        """Test connections past their max lifetime are closed on release."""
+        pool = ConnectionPool(max_size=1, max_lifetime=0)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.acquire(FakeConnection), conn)
+
+    def test_stale_idle_connection_replaced(self):
+        """Test idle connections that fail the liveness check are replaced."""
+        pool = ConnectionPool(max_size=1, check_after=0)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        conn.usable = False
+
+        new_conn = pool.acquire(FakeConnection)
+
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_liveness_check_outside_lock(self):
+        """Test a hanging liveness check does not block other threads."""
+        pool = ConnectionPool(max_size=2, timeout=5, check_after=0)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        conn.hang = threading.Event()
+        conn.checking.clear()
+        checker = threading.Thread(target=lambda: pool.release(pool.acquire(FakeConnection)))
+        checker.start()
+        self.addCleanup(checker.join)
+        self.addCleanup(conn.hang.set)
+        # The checker must hold the idle connection before this thread asks.
+        self.assertTrue(conn.checking.wait(5))
+
+        other = pool.acquire(FakeConnection)
+        pool.release(other)
+        conn.hang.set()
+        checker.join()
+
+        self.assertIsNot(other, conn)
+        self.assertEqual(pool.stats()["checkouts"], 3)
+
+    def test_metrics(self):
+        """Test waits, checkout times and connection churn are published."""
+        with tempfile.TemporaryDirectory() as tmp, override_settings(METRICS_DIR=tmp):
+            pool = ConnectionPool(name="replica", max_size=1, timeout=0.01, max_lifetime=0)
+            conn = pool.acquire(FakeConnection)
+            with self.assertRaises(PoolTimeout):
+                pool.acquire(FakeConnection)
+            pool.release(conn)
+            samples = metrics.collect()
+
+        labels = (("database", "replica"),)
+        self.assertEqual(samples[("db_pool_wait_seconds_count", labels)], 1)
+        self.assertEqual(samples[("db_pool_checkout_seconds_count", labels)], 1)
+        self.assertEqual(samples[("db_pool_timeouts_total", labels)], 1)
+        for event in ("created", "recycled"):
+            key = ("db_pool_connections_total", (("database", "replica"), ("event", event)))
+            self.assertEqual(samples[key], 1)
+
+
+class HealthCheckBackendTests(TestCase):
+    """Test connection health checks in the database backend."""
+
+    def test_unusable_connection_replaced(self):
+        """Test a dead persistent connection is closed before reuse."""
+        connection.ensure_connection()
+        connection.health_check_done = False
+
+        with patch.dict(connection.settings_dict, {"CONN_HEALTH_CHECKS": True}), patch.object(
+            connection, "is_usable", return_value=False
+        ), patch.object(connection, "close") as patched_close:
+            connection.close_if_health_check_failed()
+
+        patched_close.assert_called_once()
+        self.assertTrue(connection.health_check_done)
+
+    def test_health_check_once_per_request(self):
+        """Test the liveness check runs only on first use in a request."""
+        connection.ensure_connection()
+        connection.health_check_done = False
+
+        with patch.dict(connection.settings_dict, {"CONN_HEALTH_CHECKS": True}), patch.object(
+            connection, "is_usable", return_value=True
+        ) as patched_usable:
+            connection.cursor().close()
+            connection.cursor().close()
+
+        patched_usable.assert_called_once()
@@ -1,12 +1,21 @@
 """
 Tests for the health check API.
 """
-from django.test import TestCase
+import tempfile
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core import health
+from core.health import HealthChecker
+
+READINESS_URL = reverse("readiness-check")
+
 
 class HealthCheckTests(TestCase):
     """Test the health check API."""
@@ -18,3 +27,96 @@ class HealthCheckTests(TestCase):
         res = client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ReadinessCheckTests(TestCase):
+    """Test the readiness probe and its dependency checks."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name, HEALTH_CHECK_INTERVAL=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+
+    def test_ready(self):
+        """Test every dependency is checked and timed."""
+        res = self.client.get(READINESS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["status"], "ok")
+        checks = res.json()["checks"]
+        self.assertEqual(set(checks), {"database:default", "cache", "media"})
+        for check in checks.values():
+            self.assertTrue(check["ok"])
+            self.assertGreaterEqual(check["ms"], 0)
+
+    def test_media_unavailable_degraded(self):
+        """Test a missing media volume degrades but keeps the worker ready."""
+        with override_settings(MEDIA_ROOT=f"{self.media.name}/missing"):
+            res = self.client.get(READINESS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["status"], "degraded")
+        self.assertFalse(res.json()["checks"]["media"]["ok"])
+        self.assertIn("missing", res.json()["checks"]["media"]["error"])
+
+    @patch("core.health.check_database", side_effect=OperationalError("connection refused"))
+    def test_database_unavailable(self, patched_check):
+        """Test a failing database makes the worker unavailable."""
+        res = self.client.get(READINESS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()["status"], "unavailable")
+        self.assertEqual(
+            res.json()["checks"]["database:default"]["error"], "connection refused"
+        )
+
+    def test_report_cached_between_checks(self):
+        """Test probes are served from the last report without queries."""
+        checker = HealthChecker()
+        self.addCleanup(checker.stop)
+        with override_settings(HEALTH_CHECK_INTERVAL=60):
+            first = checker.report()
+            with self.assertNumQueries(0):
+                second = checker.report()
+
+        self.assertEqual(first["checked_at"], second["checked_at"])
+        self.assertEqual(second["status"], "ok")
+
+    def test_stale_report_unavailable(self):
+        """Test a report the checker thread stopped updating fails the probe."""
+        checker = HealthChecker()
+        self.addCleanup(checker.stop)
+        with override_settings(HEALTH_CHECK_INTERVAL=60):
+            checker.report()
+            checker._report["checked_at"] -= 600
+            report = checker.report()
+
+        self.assertEqual(report["status"], "unavailable")
+        self.assertTrue(report["stale"])
+
+
+class CacheCheckTests(TestCase):
+    """Test the cache check."""
+
+    def test_healthy_cache_read_only(self):
+        """Test the key is written once and later checks only read it."""
+        health.check_cache()
+
+        with patch("core.health.cache") as patched_cache:
+            patched_cache.get.return_value = 1
+            health.check_cache()
+
+        patched_cache.get.assert_called_once()
+        patched_cache.set.assert_not_called()
+
+    def test_evicted_key_rewritten(self):
+        """Test a missing key is written again and read back."""
+        health.check_cache()
+        health.cache.delete(health._CACHE_KEY)
+
+        health.check_cache()
+
+        self.assertEqual(health.cache.get(health._CACHE_KEY), 1)
@@ -0,0 +1,94 @@
+"""
+Import-time budget for a fresh process serving its first health check.
+
+The application is loaded without warmup in a new interpreter started with
+-X importtime. Modules only some routes need must stay unimported, and the
+number of modules and their total import time must stay within budget.
+IMPORT_TIME_BUDGET_MS overrides the time budget on slow machines.
+"""
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+MODULE_BUDGET = 700
+TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1000))
+
+# Imported by the schema, docs, admin, API and image routes on first use.
+LAZY_MODULES = (
+    "drf_spectacular.views",
+    "yaml",
+    "PIL",
+    "core.admin_urls",
+    "rest_framework.renderers",
+    "rest_framework.serializers",
+    "user.views",
+    "recipe.views",
+)
+
+SCRIPT = """
+from app.wsgi import application
+from benchmarks.loadtest import build_environ
+
+statuses = []
+response = application(
+    build_environ("localhost", "GET", "/api/health-check/"),
+    lambda status, headers, exc_info=None: statuses.append(status),
+)
+b"".join(response)
+response.close()
+print(statuses[0])
+"""
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|( *)(\S+)$")
+
+
+def run_health_check():
+    """Serve one health check in a new interpreter and return (status, imports).
+
+    imports maps each imported module to its own import time in microseconds.
+    """
+    env = {**os.environ, "WARMUP_PRELOAD": "0", "ALLOWED_HOSTS": "localhost"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports[match.group(3)] = int(match.group(1))
+    return result.stdout.strip(), imports
+
+
+class ImportTimeTests(SimpleTestCase):
+    """Test the imports needed to serve the first health check."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.status, cls.imports = run_health_check()
+
+    def test_health_check_served(self):
+        """Test the fresh process answers the health check."""
+        self.assertEqual(self.status, "200 OK")
+
+    def test_route_specific_modules_lazy(self):
+        """Test modules only some routes need are not imported."""
+        for module in LAZY_MODULES:
+            with self.subTest(module=module):
+                self.assertFalse(module in self.imports, f"{module} was imported.")
+
+    def test_import_budget(self):
+        """Test the number of modules and their import time stay within budget."""
+        total_ms = sum(self.imports.values()) / 1000
+
+        self.assertLessEqual(len(self.imports), MODULE_BUDGET)
+        self.assertLessEqual(total_ms, TIME_BUDGET_MS)
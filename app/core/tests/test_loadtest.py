@@ -0,0 +1,61 @@
+"""
+Tests for the in-process load generator.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from benchmarks import loadtest
+
+
+class LoadTestHelperTests(SimpleTestCase):
+    """Test mix parsing and summaries."""
+
+    def test_parse_mix(self):
+        """Test weights default to one and unknown endpoints are rejected."""
+        self.assertEqual(loadtest.parse_mix("recipe-list:3,token"), {"recipe-list": 3, "token": 1})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("recipes:1")
+
+    def test_summarize(self):
+        """Test percentiles and errors per endpoint and in total."""
+        results = [("tag-list", 200, i / 100) for i in range(1, 101)]
+        results.append(("token", 400, 0.5))
+
+        summary = loadtest.summarize(results, elapsed=2.0)
+
+        self.assertEqual(summary["tag-list"]["p50"], 0.5)
+        self.assertEqual(summary["tag-list"]["p99"], 0.99)
+        self.assertEqual(summary["token"]["errors"], 1)
+        self.assertEqual(summary["total"]["requests"], 101)
+        self.assertEqual(summary["total"]["rps"], 50.5)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """Test the loadtest command against the WSGI application."""
+
+    def test_threaded_run(self):
+        """Test requests from a thread pool succeed and are reported per endpoint."""
+        out = StringIO()
+
+        call_command(
+            "loadtest",
+            concurrency=2,
+            requests=20,
+            host="testserver",
+            mix="recipe-list:1,recipe-detail:1,recipe-create:1,user-me:1",
+            cleanup=True,
+            stdout=out,
+        )
+
+        lines = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[2:]}
+        self.assertEqual(lines["total"][1:3], ["20", "0"])
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_invalid_mix(self):
+        """Test an unknown endpoint in the mix is an error."""
+        with self.assertRaises(CommandError):
+            call_command("loadtest", mix="nope:1", stdout=StringIO())
@@ -0,0 +1,124 @@
+"""
+Tests for multi-process metrics.
+"""
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+
+METRICS_URL = reverse("metrics")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class MmapedDictTests(SimpleTestCase):
+    """Test the mmap-backed store."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_values_persist_and_aggregate_across_files(self):
+        """Test values survive reopening and files of all processes are summed."""
+        for name, amount in (("metrics_1.db", 2), ("metrics_2.db", 3)):
+            store = metrics.MmapedDict(os.path.join(self.tmp.name, name))
+            store.inc('["requests", []]', amount)
+        reopened = metrics.MmapedDict(os.path.join(self.tmp.name, "metrics_1.db"))
+        reopened.inc('["requests", []]', 1)
+
+        with override_settings(METRICS_DIR=self.tmp.name):
+            samples = metrics.collect()
+
+        self.assertEqual(samples[("requests", ())], 6.0)
+
+    def test_file_grows_past_initial_size(self):
+        """Test the store remaps its file when it runs out of space."""
+        store = metrics.MmapedDict(os.path.join(self.tmp.name, "metrics_1.db"))
+        for i in range(20000):
+            store.inc(f'["series", [["n", "{i}"]]]', 1)
+
+        with override_settings(METRICS_DIR=self.tmp.name):
+            samples = metrics.collect()
+
+        self.assertEqual(len(samples), 20000)
+        self.assertEqual(samples[("series", (("n", "19999"),))], 1.0)
+
+
+class MetricsTests(TestCase):
+    """Test recording and exposing metrics."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(METRICS_DIR=self.tmp.name, METRICS_TOKEN="secret")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_histogram_exposition(self):
+        """Test histogram buckets are exposed cumulatively with sum and count."""
+        metrics.REQUEST_LATENCY.observe(0.003, view="v", method="GET")
+        metrics.REQUEST_LATENCY.observe(0.2, view="v", method="GET")
+
+        text = metrics.generate_latest()
+
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertIn(
+            'http_request_duration_seconds_bucket{le="0.005",method="GET",view="v"} 1.0', text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{le="0.25",method="GET",view="v"} 2.0', text
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{le="+Inf",method="GET",view="v"} 2.0', text
+        )
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="v"} 2.0', text)
+
+    def test_requests_are_recorded_per_view(self):
+        """Test the middleware records latency, status and DB time per view."""
+        user = get_user_model().objects.create_user(email="user@example.com", password="pass123")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        client.get(RECIPES_URL)
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        text = res.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",view="RecipeViewSet.list"} 1.0',
+            text,
+        )
+        self.assertIn('http_responses_total{status="200",view="RecipeViewSet.list"} 1.0', text)
+        self.assertIn('db_queries_total{view="RecipeViewSet.list"}', text)
+
+    def test_metrics_disabled(self):
+        """Test the endpoint is not found when metrics are disabled."""
+        with override_settings(METRICS_DIR=""):
+            res = APIClient().get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_token_required(self):
+        """Test the endpoint requires the bearer token."""
+        client = APIClient()
+
+        missing = client.get(METRICS_URL)
+        wrong = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer other")
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(missing.status_code, 403)
+        self.assertEqual(wrong.status_code, 403)
+        self.assertEqual(res.status_code, 200)
+
+    def test_no_token_configured(self):
+        """Test the endpoint refuses every request when no token is set."""
+        with override_settings(METRICS_TOKEN=""):
+            res = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION="Bearer ")
+
+        self.assertEqual(res.status_code, 403)
@@ -0,0 +1,314 @@
+"""
+Tests for the app middleware.
+"""
+import gzip
+import json
+import tempfile
+import zlib
+from decimal import Decimal
+
+import brotli
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.compression import negotiate
+from core.middleware import CompressionMiddleware, PathScopedMiddleware
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def create_user(email="user@example.com", password="test123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    """Test per-request timing instrumentation."""
+
+    def setUp(self):
+        self.user = create_user()
+        recipe = Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Dinner"))
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_server_timing_header_and_log(self):
+        """Test timings are reported in a header and a log line."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs("core.requests", level="INFO") as logs:
+            res = client.get(RECIPES_URL)
+
+        timing = res["Server-Timing"]
+        for metric in ("db;dur=", "serializer;dur=", "render;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry["view"], "RecipeViewSet.list")
+        self.assertEqual(entry["status"], 200)
+        self.assertGreater(entry["queries"], 0)
+        self.assertIn(f'desc="{entry["queries"]} queries"', timing)
+        self.assertGreater(entry["serializer_ms"], 0)
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_action_label(self):
+        """Test extra actions are labelled with their action name."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        recipe = Recipe.objects.get(user=self.user)
+
+        with self.assertLogs("core.requests", level="INFO") as logs:
+            client.get(reverse("recipe:recipe-image", args=[recipe.id]))
+
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(entry["view"], "RecipeViewSet.retrieve_image")
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled_by_default(self):
+        """Test nothing is added when timing is disabled."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPES_URL)
+
+        self.assertNotIn("Server-Timing", res)
+
+
+class NegotiateTests(SimpleTestCase):
+    """Test choosing the encoding from Accept-Encoding."""
+
+    def test_negotiate(self):
+        cases = [
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("GZIP;Q=0.8, br;q=0", "gzip"),
+            ("*", "br"),
+            ("*, br;q=0", "gzip"),
+            ("gzip;q=bad", None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(negotiate(header), expected)
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Test response compression."""
+
+    def setUp(self):
+        self.user = create_user()
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f"Soup {i}", time_minutes=5, price=Decimal("1.50")
+            )
+            recipe.tags.add(Tag.objects.get_or_create(user=self.user, name="Dinner")[0])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.plain = self.client.get(RECIPES_URL).content
+
+    def test_gzip(self):
+        """Test a client accepting gzip gets the list gzipped."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", res["Vary"])
+        self.assertEqual(int(res["Content-Length"]), len(res.content))
+        self.assertLess(len(res.content), len(self.plain) / 3)
+        self.assertEqual(gzip.decompress(res.content), self.plain)
+
+    def test_brotli_preferred(self):
+        """Test brotli is used when the client accepts it."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(res.content), self.plain)
+
+    def test_not_accepted(self):
+        """Test clients without Accept-Encoding get the body as it is."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn("Content-Encoding", res)
+        self.assertIn("Accept-Encoding", res["Vary"])
+
+    @override_settings(COMPRESSION_MIN_SIZE=10000)
+    def test_small_response(self):
+        """Test responses under the minimum size are not compressed."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", res)
+        self.assertEqual(res.content, self.plain)
+
+    def test_encoded_response(self):
+        """Test responses the view already compressed are left alone."""
+        body = gzip.compress(b'{"a": 1}\n' * 100)
+        response = HttpResponse(body, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+        middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, br")
+
+        res = middleware(request)
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res.content, body)
+
+    def test_skipped_content_types(self):
+        """Test images and HTML are not compressed."""
+        middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        for content_type in ("image/png", "text/html; charset=utf-8"):
+            with self.subTest(content_type=content_type):
+                response = HttpResponse(b"a" * 1000, content_type=content_type)
+                self.assertNotIn("Content-Encoding", middleware(request))
+
+    def test_streaming(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        chunks = [b"", b'{"a": 1}\n' * 100, b'{"b": 2}\n' * 100]
+        response = StreamingHttpResponse(iter(chunks), content_type="application/json")
+        response["ETag"] = '"abc"'
+        middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        res = middleware(request)
+        parts = list(res.streaming_content)
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res["ETag"], 'W/"abc"')
+        self.assertNotIn("Content-Length", res)
+        # Each chunk is flushed, so it can be decompressed on arrival.
+        decompressor = zlib.decompressobj(31)
+        self.assertEqual(decompressor.decompress(parts[0]), chunks[1])
+        self.assertEqual(gzip.decompress(b"".join(parts)), b"".join(chunks))
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_metrics_and_server_timing(self):
+        """Test sizes and CPU time are recorded and reported."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        with override_settings(METRICS_DIR=tmp.name), self.assertLogs("core.requests"):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            res = client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="br")
+            samples = metrics.collect()
+
+        self.assertRegex(res["Server-Timing"], r'compress;dur=[0-9.]+;desc="br 0\.[0-9]+"')
+        labels = (("encoding", "br"), ("view", "RecipeViewSet.list"))
+        self.assertEqual(
+            samples[("http_response_compression_input_bytes_total", labels)], len(self.plain)
+        )
+        self.assertEqual(
+            samples[("http_response_compression_output_bytes_total", labels)], len(res.content)
+        )
+        self.assertIn(("http_response_compression_cpu_seconds_total", labels), samples)
+        self.assertEqual(samples[("http_response_compression_ratio_count", labels)], 1)
+
+
+class RecordingMiddleware:
+    """Middleware recording the hooks called on it."""
+
+    calls = []
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        self.calls.append("call")
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.calls.append("view")
+
+    def process_template_response(self, request, response):
+        self.calls.append("template_response")
+        return response
+
+    def process_exception(self, request, exception):
+        self.calls.append("exception")
+        return HttpResponse("handled")
+
+
+class PathScopedMiddlewareTests(TestCase):
+    """Test browser middleware is skipped for the token API."""
+
+    def test_stack_by_path(self):
+        """Test sessions and users are only set up outside the API."""
+        seen = {}
+
+        def get_response(request):
+            seen[request.path] = [hasattr(request, name) for name in ("session", "user")]
+            return HttpResponse()
+
+        middleware = PathScopedMiddleware(get_response)
+        for path in ("/api/recipe/recipes/", "/admin/"):
+            middleware(RequestFactory().get(path))
+
+        self.assertEqual(seen, {"/api/recipe/recipes/": [False, False], "/admin/": [True, True]})
+
+    def test_csrf_outside_api_only(self):
+        """Test CSRF is still enforced on the admin, and not on the token API."""
+        create_user()
+        client = Client(enforce_csrf_checks=True)
+
+        admin = client.post(reverse("admin:login"), {"username": "user@example.com"})
+        api = client.post(
+            reverse("user:token"),
+            {"email": "user@example.com", "password": "test123"},
+        )
+
+        self.assertEqual(admin.status_code, 403)
+        self.assertEqual(api.status_code, 200)
+        self.assertNotIn("csrftoken", api.cookies)
+
+    def test_admin_and_browsable_api(self):
+        """Test the admin and the browsable API still work."""
+        admin = get_user_model().objects.create_superuser("admin@example.com", "test123")
+        client = Client()
+        client.force_login(admin)
+        api_client = APIClient()
+        api_client.force_authenticate(admin)
+
+        res = client.get(reverse("admin:core_recipe_changelist"))
+        api = api_client.get(RECIPES_URL, HTTP_ACCEPT="text/html")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.wsgi_request.user, admin)
+        self.assertEqual(api.status_code, 200)
+        self.assertIn(b"Recipe List", api.content)
+
+    @override_settings(BROWSER_MIDDLEWARE=["core.tests.test_middleware.RecordingMiddleware"])
+    def test_hooks(self):
+        """Test the scoped middleware's hooks are called outside the API only."""
+        middleware = PathScopedMiddleware(lambda request: HttpResponse())
+        view = (lambda request: None, (), {})
+        template_response = HttpResponse()
+
+        for path in ("/api/", "/admin/"):
+            RecordingMiddleware.calls = []
+            request = RequestFactory().get(path)
+            middleware(request)
+            middleware.process_view(request, *view)
+            self.assertIs(
+                middleware.process_template_response(request, template_response),
+                template_response,
+            )
+            handled = middleware.process_exception(request, ValueError())
+            with self.subTest(path=path):
+                if path == "/api/":
+                    self.assertEqual(RecordingMiddleware.calls, [])
+                    self.assertIsNone(handled)
+                else:
+                    self.assertEqual(
+                        RecordingMiddleware.calls,
+                        ["call", "view", "template_response", "exception"],
+                    )
+                    self.assertEqual(handled.content, b"handled")
@@ -0,0 +1,244 @@
+"""
+Query-count and latency budgets for the API endpoints.
+
+Every endpoint is requested with 1, 50 and 500 rows of data and must stay
+within its query budget at each size, so an N+1 query fails the build.
+Wall-clock timings are compared with perf_baseline.json: slowdowns beyond
+PERF_TOLERANCE are reported as warnings, or failures with PERF_STRICT=1.
+Run with PERF_UPDATE_BASELINE=1 to record a new baseline.
+"""
+import json
+import os
+import statistics
+import tempfile
+import time
+import warnings
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "perf_baseline.json")
+UPDATE_BASELINE = bool(int(os.environ.get("PERF_UPDATE_BASELINE", 0)))
+STRICT = bool(int(os.environ.get("PERF_STRICT", 0)))
+TOLERANCE = float(os.environ.get("PERF_TOLERANCE", 0.5))
+REPEATS = 3
+
+SIZES = (1, 50, 500)
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+ME_URL = reverse("user:me")
+TOKEN_URL = reverse("user:token")
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Create and return an image upload URL."""
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
+def load_baseline():
+    """Return the recorded timings, or an empty dict if there are none."""
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class PerformanceBudgetTests(TestCase):
+    """Test endpoints stay within their query and latency budgets."""
+
+    baseline = load_baseline()
+    timings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if UPDATE_BASELINE and cls.timings:
+            with open(BASELINE_FILE, "w") as f:
+                json.dump({**cls.baseline, **cls.timings}, f, indent=2, sort_keys=True)
+                f.write("\n")
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="testpass123",
+        )
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Detail recipe",
+            time_minutes=10,
+            price=Decimal("2.50"),
+        )
+        self.rows = 0
+
+    def seed(self, size):
+        """Grow the data set to size recipes, tags and ingredients."""
+        count = size - self.rows
+        tags = Tag.objects.bulk_create(
+            Tag(user=self.user, name=f"Tag {self.rows + i}") for i in range(count)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=self.user, name=f"Ingredient {self.rows + i}") for i in range(count)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                title=f"Recipe {self.rows + i}",
+                time_minutes=5,
+                price=Decimal("1.00"),
+            )
+            for i in range(count)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag) for recipe, tag in zip(recipes, tags)
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(recipe=recipe, ingredient=ingredient)
+            for recipe, ingredient in zip(recipes, ingredients)
+        )
+        # The detail recipe grows with the data set too.
+        self.recipe.tags.add(*tags)
+        self.recipe.ingredients.add(*ingredients)
+        self.rows = size
+        self.first_tag = Tag.objects.filter(user=self.user).order_by("id").first()
+
+    def assertBudget(self, name, max_queries, request):
+        """Assert request() stays within max_queries at every data size."""
+        for size in SIZES:
+            self.seed(size)
+            with self.subTest(endpoint=name, rows=size):
+                with CaptureQueriesContext(connection) as queries:
+                    res = request()
+                self.assertLess(res.status_code, 400, res.content[:200])
+                self.assertLessEqual(
+                    len(queries),
+                    max_queries,
+                    "\n".join(query["sql"] for query in queries.captured_queries),
+                )
+                self.check_latency(f"{name}@{size}", request)
+
+    def check_latency(self, key, request):
+        """Record the median latency of request() and compare it to the baseline."""
+        durations = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            request()
+            durations.append(time.perf_counter() - start)
+        median = statistics.median(durations)
+        self.timings[key] = round(median, 6)
+
+        expected = self.baseline.get(key)
+        if UPDATE_BASELINE or expected is None or median <= expected * (1 + TOLERANCE):
+            return
+        message = f"{key} took {median * 1000:.1f}ms, baseline {expected * 1000:.1f}ms."
+        if STRICT:
+            self.fail(message)
+        warnings.warn(message)
+
+    def test_recipe_list(self):
+        """Test listing recipes prefetches tags and ingredients."""
+        self.assertBudget("recipe-list", 4, lambda: self.client.get(RECIPES_URL))
+
+    def test_recipe_list_filtered(self):
+        """Test filtering recipes by tag."""
+        self.assertBudget(
+            "recipe-list-filtered",
+            4,
+            lambda: self.client.get(RECIPES_URL, {"tags": str(self.first_tag.id)}),
+        )
+
+    def test_recipe_detail(self):
+        """Test retrieving a recipe with many tags and ingredients."""
+        self.assertBudget(
+            "recipe-detail",
+            4,
+            lambda: self.client.get(detail_url(self.recipe.id)),
+        )
+
+    def test_recipe_create(self):
+        """Test creating a recipe with a tag and an ingredient."""
+        payload = {
+            "title": "New recipe",
+            "time_minutes": 30,
+            "price": "5.99",
+            "tags": [{"name": "Dinner"}],
+            "ingredients": [{"name": "Salt"}],
+        }
+        self.assertBudget(
+            "recipe-create",
+            14,
+            lambda: self.client.post(RECIPES_URL, payload, format="json"),
+        )
+
+    def test_recipe_partial_update(self):
+        """Test updating a recipe."""
+        self.assertBudget(
+            "recipe-update",
+            5,
+            lambda: self.client.patch(detail_url(self.recipe.id), {"title": "Renamed"}),
+        )
+
+    def test_recipe_upload_image(self):
+        """Test uploading a recipe image."""
+        def upload():
+            """Upload a small JPEG."""
+            with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+                Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+                image_file.seek(0)
+                return self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+
+        # Every run stores a new image, so keep them out of MEDIA_ROOT.
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            self.assertBudget("recipe-upload-image", 3, upload)
+
+    def test_tag_list(self):
+        """Test listing tags."""
+        self.assertBudget("tag-list", 2, lambda: self.client.get(TAGS_URL))
+
+    def test_tag_list_assigned_only(self):
+        """Test listing tags assigned to recipes."""
+        self.assertBudget(
+            "tag-list-assigned",
+            2,
+            lambda: self.client.get(TAGS_URL, {"assigned_only": 1}),
+        )
+
+    def test_ingredient_list(self):
+        """Test listing ingredients."""
+        self.assertBudget("ingredient-list", 2, lambda: self.client.get(INGREDIENTS_URL))
+
+    def test_user_me(self):
+        """Test retrieving the user profile."""
+        self.assertBudget("user-me", 1, lambda: self.client.get(ME_URL))
+
+    def test_token(self):
+        """Test creating a token."""
+        payload = {"email": "user@example.com", "password": "testpass123"}
+        self.assertBudget("token", 2, lambda: APIClient().post(TOKEN_URL, payload))
@@ -0,0 +1,136 @@
+"""
+Tests for the request profiler.
+"""
+import collections
+import os
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import profiling
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def busy_loop(seconds):
+    """Keep the CPU busy for seconds."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SamplerTests(SimpleTestCase):
+    """Test the stack sampler."""
+
+    def test_samples_target_thread(self):
+        """Test stacks of the sampled thread are counted root first."""
+        sampler = profiling.Sampler(threading.get_ident(), 0.001)
+        sampler.start()
+        busy_loop(0.05)
+        stacks = sampler.stop()
+
+        self.assertTrue(stacks)
+        stack = stacks.most_common(1)[0][0]
+        self.assertTrue(stack.endswith("core.tests.test_profiling:busy_loop"))
+
+    def test_profile_id(self):
+        """Test the proxy's request ID is used only if safe, always with a random suffix."""
+        factory = RequestFactory()
+
+        safe = factory.get("/", HTTP_X_REQUEST_ID="abc-123")
+        unsafe = factory.get("/", HTTP_X_REQUEST_ID="../../etc/passwd")
+
+        self.assertRegex(profiling.profile_id(safe), r"^abc-123-[0-9a-f]{12}$")
+        self.assertNotEqual(profiling.profile_id(safe), profiling.profile_id(safe))
+        self.assertRegex(profiling.profile_id(unsafe), r"^[0-9a-f]{32}$")
+
+    def test_prune_keeps_newest(self):
+        """Test pruning deletes the oldest profiles beyond the limit."""
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(5):
+                path = os.path.join(tmp, f"{i}.folded")
+                profiling.write_folded(path, collections.Counter({"a": 1}))
+                os.utime(path, (i, i))
+
+            profiling.prune(tmp, 2)
+
+            self.assertEqual(sorted(os.listdir(tmp)), ["3.folded", "4.folded"])
+
+
+class ProfilerMiddlewareTests(TestCase):
+    """Test profiling requests on demand."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(PROFILER_OUTPUT_DIR=self.tmp.name, PROFILER_SAMPLE_RATE=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="pass123",
+        )
+        self.client = APIClient()
+
+    def get(self, **headers):
+        token = Token.objects.get_or_create(user=self.user)[0]
+        return self.client.get(
+            RECIPES_URL,
+            HTTP_AUTHORIZATION=f"Token {token.key}",
+            HTTP_X_REQUEST_ID="req-1",
+            **headers,
+        )
+
+    def test_staff_header_profiles_request(self):
+        """Test a staff user can ask for a profile."""
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.get(HTTP_X_PROFILE="1")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["X-Profile-Id"].startswith("req-1-"))
+        self.assertEqual(os.listdir(self.tmp.name), [f"{res['X-Profile-Id']}.folded"])
+
+    def test_repeated_request_id_not_overwritten(self):
+        """Test profiles of requests sharing a request ID are kept apart."""
+        self.user.is_staff = True
+        self.user.save()
+
+        first = self.get(HTTP_X_PROFILE="1")
+        second = self.get(HTTP_X_PROFILE="1")
+
+        self.assertNotEqual(first["X-Profile-Id"], second["X-Profile-Id"])
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_profiles_capped(self):
+        """Test only the newest PROFILER_MAX_FILES profiles are kept."""
+        self.user.is_staff = True
+        self.user.save()
+
+        with override_settings(PROFILER_MAX_FILES=2):
+            for _ in range(4):
+                self.get(HTTP_X_PROFILE="1")
+
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_header_ignored_for_non_staff(self):
+        """Test other users cannot trigger profiling."""
+        res = self.get(HTTP_X_PROFILE="1")
+
+        self.assertNotIn("X-Profile-Id", res)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_sample_rate(self):
+        """Test requests are profiled at random when a sample rate is set."""
+        with override_settings(PROFILER_SAMPLE_RATE=1.0):
+            res = self.get()
+
+        self.assertTrue(res["X-Profile-Id"].startswith("req-1-"))
@@ -0,0 +1,153 @@
+"""
+Query plan snapshot tests for the hot queries.
+
+The plans of the queries run by each endpoint on a seeded data set are
+reduced to their shape (node types, relations and indexes) and compared
+with query_plans.json, keyed by PostgreSQL major version. The test is
+skipped, before seeding, on a version without a snapshot. Run it with
+PLAN_SNAPSHOT_UPDATE=1 against a server of that version to record or
+accept new plans; the snapshot file is never written otherwise.
+"""
+import json
+import os
+from io import StringIO
+from unittest import SkipTest, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Tag, User
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), "query_plans.json")
+UPDATE = bool(int(os.environ.get("PLAN_SNAPSHOT_UPDATE", 0)))
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+ME_URL = reverse("user:me")
+
+
+def plan_shape(node, depth=0):
+    """Return one line per plan node with its type, relation and index."""
+    line = node["Node Type"]
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+    lines = ["  " * depth + line]
+    for child in node.get("Plans", []):
+        lines.extend(plan_shape(child, depth + 1))
+    return lines
+
+
+def explain(sql):
+    """Return the plan shape of sql."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan_shape(plan[0]["Plan"])
+
+
+def server_version():
+    """Return the snapshot key of the server, e.g. "postgresql-13"."""
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW server_version_num")
+        return f"postgresql-{int(cursor.fetchone()[0]) // 10000}"
+
+
+def load_snapshots():
+    """Return the recorded plans keyed by server version."""
+    try:
+        with open(SNAPSHOT_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@skipUnless(connection.vendor == "postgresql", "Plans are PostgreSQL specific.")
+class QueryPlanTests(TestCase):
+    """Test the plans of hot queries against the snapshot."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Checked before seeding, which takes a while.
+        cls.version = server_version()
+        cls.snapshots = load_snapshots()
+        if not UPDATE and cls.version not in cls.snapshots:
+            raise SkipTest(
+                f"No query plan snapshot for {cls.version}; "
+                "run with PLAN_SNAPSHOT_UPDATE=1 to record one."
+            )
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_data",
+            users=1000,
+            recipes_per_user=20,
+            image_ratio=0,
+            stdout=StringIO(),
+        )
+        Token.objects.bulk_create(
+            Token(user=user, key=Token.generate_key()) for user in User.objects.all()
+        )
+        with connection.cursor() as cursor:
+            # A sample of 300 * target rows covers every seeded table, so the
+            # statistics, and the plans, do not vary with ANALYZE's sampling.
+            cursor.execute("SET LOCAL default_statistics_target = 1000")
+            cursor.execute("ANALYZE")
+        cls.user = User.objects.get(email="seed0-user0@example.com")
+        cls.token = Token.objects.get(user=cls.user)
+        cls.tag = Tag.objects.filter(user=cls.user).order_by("id").first()
+        cls.ingredient = Ingredient.objects.filter(user=cls.user).order_by("id").first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def capture(self, url, params=None):
+        """Return the plan shapes of the SELECTs run by GET url."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        return [
+            explain(query["sql"])
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+
+    def test_plans_match_snapshot(self):
+        """Test no hot query changed plan shape."""
+        plans = {
+            "token-lookup": self.capture(ME_URL),
+            "recipe-list": self.capture(RECIPES_URL),
+            "recipe-list-tags": self.capture(RECIPES_URL, {"tags": self.tag.id}),
+            "recipe-list-ingredients": self.capture(
+                RECIPES_URL, {"ingredients": self.ingredient.id}
+            ),
+            "recipe-list-tags-ingredients": self.capture(
+                RECIPES_URL, {"tags": self.tag.id, "ingredients": self.ingredient.id}
+            ),
+            "tag-list-assigned": self.capture(TAGS_URL, {"assigned_only": 1}),
+            "ingredient-list-assigned": self.capture(INGREDIENTS_URL, {"assigned_only": 1}),
+        }
+
+        if UPDATE:
+            snapshots = {**self.snapshots, self.version: plans}
+            with open(SNAPSHOT_FILE, "w") as f:
+                json.dump(snapshots, f, indent=2, sort_keys=True)
+                f.write("\n")
+            self.skipTest(f"Recorded query plans for {self.version}.")
+
+        for name, expected in self.snapshots[self.version].items():
+            with self.subTest(query=name):
+                self.assertEqual(plans[name], expected)
@@ -0,0 +1,286 @@
+"""
+Tests for the orjson and MessagePack renderers and parsers.
+"""
+import datetime
+import json
+import tempfile
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag
+from core.renderers import (
+    FastJSONParser,
+    FastJSONRenderer,
+    MessagePackParser,
+    MessagePackRenderer,
+    msgpack,
+)
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+PAYLOADS = {
+    "empty": {},
+    "nested": {"a": [1, 2.5, None, True, {"b": "c"}], "d": ()},
+    "decimal": {"price": Decimal("5.99"), "zero": Decimal("0.00")},
+    "dates": {
+        "datetime": datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        "naive": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "date": datetime.date(2024, 1, 2),
+        "time": datetime.time(3, 4, 5, 600000),
+        "duration": datetime.timedelta(minutes=90),
+    },
+    "uuid": {"id": uuid.UUID("12345678-1234-5678-1234-567812345678")},
+    "text": {"unicode": "Crème brûlée 🍮", "separators": "a b c", "quote": '"\\'},
+    "lazy": {"detail": gettext_lazy("Not found."), "error": ErrorDetail("Bad", code="bad")},
+    "keys": {1: "int", None: "none", 2.5: "float"},
+    "iterables": {"set": {1}, "frozenset": frozenset(), "bytes": b"raw"},
+    "big_int": {"n": 2 ** 70},
+    "list": [{"id": 1}, {"id": 2}],
+}
+
+
+class FastJSONRendererTests(TestCase):
+    """Test FastJSONRenderer output matches JSONRenderer byte for byte."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="testpass123",
+        )
+        self.request = Request(APIRequestFactory().get("/"))
+
+    def assertParity(self, data, **context):
+        """Assert both renderers produce the same bytes for data."""
+        expected = JSONRenderer().render(data, "application/json", context)
+        self.assertEqual(FastJSONRenderer().render(data, "application/json", context), expected)
+        return expected
+
+    def test_payload_parity(self):
+        """Test parity for the types DRF's encoder handles."""
+        for name, data in PAYLOADS.items():
+            with self.subTest(payload=name):
+                self.assertParity(data)
+
+    def test_serializer_parity(self):
+        """Test parity for recipe lists and details with prices and image URLs."""
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {i} ünïcode",
+                time_minutes=5 + i,
+                price=Decimal("12.50") + i,
+                image=f"uploads/recipe/{i}.jpg" if i % 2 else "",
+            )
+            recipe.tags.add(tag)
+            recipes.append(recipe)
+        context = {"request": self.request}
+
+        self.assertParity(RecipeSerializer(recipes, many=True, context=context).data)
+        outputs = [
+            self.assertParity(RecipeDetailSerializer(recipe, context=context).data)
+            for recipe in recipes
+        ]
+        self.assertIn(b"/image/", outputs[1])
+
+    def test_indent_parity(self):
+        """Test indented output falls back to the stdlib renderer."""
+        self.assertParity(PAYLOADS["nested"], indent=4)
+
+    def test_none(self):
+        """Test None renders as an empty body."""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    @patch("core.renderers.orjson", None)
+    def test_stdlib_fallback(self):
+        """Test the renderer works without orjson."""
+        self.assertParity(PAYLOADS["decimal"])
+
+
+class FastJSONParserTests(TestCase):
+    """Test FastJSONParser parses like JSONParser."""
+
+    def parse(self, parser, body):
+        """Parse body with parser."""
+        return parser.parse(BytesIO(body), "application/json", {"encoding": "utf-8"})
+
+    def test_parse_parity(self):
+        """Test valid documents parse to the same data."""
+        for body in (
+            b'{"title": "Cr\xc3\xa8me", "price": "5.99", "tags": [{"name": "a"}]}',
+            b"[1, 2.5, null, true]",
+            b'{"n": 1180591620717411303424}',
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(
+                    self.parse(FastJSONParser(), body),
+                    self.parse(JSONParser(), body),
+                )
+
+    def test_parse_errors(self):
+        """Test invalid documents and non-standard constants are rejected."""
+        for body in (b"{", b'{"a": NaN}', b"[Infinity]"):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    self.parse(FastJSONParser(), body)
+
+    def test_other_encodings(self):
+        """Test documents in other encodings are decoded first."""
+        body = '{"title": "Crème"}'.encode("latin-1")
+        data = FastJSONParser().parse(BytesIO(body), "application/json", {"encoding": "latin-1"})
+
+        self.assertEqual(data, {"title": "Crème"})
+
+
+MSGPACK = "application/msgpack"
+
+
+class MessagePackTests(TestCase):
+    """Test MessagePack requests and responses for every serializer."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="testpass123",
+            name="Test User",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Sample recipe",
+            time_minutes=22,
+            price=Decimal("5.25"),
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="Dinner"))
+
+    def assertRoundTrip(self, method, url, payload=None, client=None, status=200):
+        """Send payload as MessagePack and assert the response decodes to res.data."""
+        res = (client or self.client).generic(
+            method,
+            url,
+            msgpack.packb(payload) if payload is not None else b"",
+            content_type=MSGPACK,
+            HTTP_ACCEPT=MSGPACK,
+        )
+
+        self.assertEqual(res.status_code, status, res.content)
+        self.assertEqual(res["Content-Type"], MSGPACK)
+        # The same values a JSON client gets.
+        expected = json.loads(JSONRenderer().render(res.data))
+        self.assertEqual(msgpack.unpackb(res.content), expected)
+        return expected
+
+    def test_user_serializers(self):
+        """Test creating a user and a token, and managing the profile."""
+        anonymous = APIClient()
+        payload = {"email": "new@example.com", "password": "testpass123", "name": "New"}
+
+        created = self.assertRoundTrip(
+            "POST", reverse("user:create"), payload, client=anonymous, status=201
+        )
+        token = self.assertRoundTrip(
+            "POST",
+            reverse("user:token"),
+            {"email": "new@example.com", "password": "testpass123"},
+            client=anonymous,
+        )
+        me = self.assertRoundTrip("PATCH", reverse("user:me"), {"name": "Renamed"})
+
+        self.assertEqual(created["email"], "new@example.com")
+        self.assertIn("token", token)
+        self.assertEqual(me["name"], "Renamed")
+
+    def test_recipe_serializers(self):
+        """Test listing, creating, retrieving and updating recipes."""
+        detail = reverse("recipe:recipe-detail", args=[self.recipe.id])
+        payload = {
+            "title": "Crème brûlée",
+            "time_minutes": 45,
+            "price": "7.10",
+            "tags": [{"name": "Dessert"}],
+            "ingredients": [{"name": "Cream"}],
+        }
+
+        recipes = self.assertRoundTrip("GET", reverse("recipe:recipe-list"))
+        created = self.assertRoundTrip("POST", reverse("recipe:recipe-list"), payload, status=201)
+        self.assertRoundTrip("GET", detail)
+        updated = self.assertRoundTrip("PATCH", detail, {"price": "6.00"})
+
+        self.assertEqual(recipes[0]["price"], "5.25")
+        self.assertEqual(created["title"], "Crème brûlée")
+        self.assertEqual(updated["price"], "6.00")
+
+    def test_tag_and_ingredient_serializers(self):
+        """Test listing and updating tags and ingredients."""
+        tag = self.recipe.tags.get()
+
+        self.assertRoundTrip("GET", reverse("recipe:tag-list"))
+        self.assertRoundTrip(
+            "PATCH", reverse("recipe:tag-detail", args=[tag.id]), {"name": "Lunch"}
+        )
+        self.assertRoundTrip("GET", reverse("recipe:ingredient-list"))
+
+    def test_image_serializers(self):
+        """Test image upload, direct upload URL and finalize responses."""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+            image_file.seek(0)
+            res = self.client.post(
+                reverse("recipe:recipe-upload-image", args=[self.recipe.id]),
+                {"image": image_file},
+                format="multipart",
+                HTTP_ACCEPT=MSGPACK,
+            )
+        self.addCleanup(lambda: Recipe.objects.get(id=self.recipe.id).image.delete())
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("/image/", msgpack.unpackb(res.content)["image"])
+
+        upload = self.assertRoundTrip(
+            "POST",
+            reverse("recipe:recipe-image-upload-url", args=[self.recipe.id]),
+            {"filename": "photo.jpg", "content_type": "image/jpeg"},
+        )
+        errors = self.assertRoundTrip(
+            "POST",
+            reverse("recipe:recipe-finalize-image", args=[self.recipe.id]),
+            {"upload_token": upload["upload_token"]},
+            status=400,
+        )
+        self.assertEqual(errors, {"upload_token": ["Image has not been uploaded."]})
+
+    def test_invalid_body(self):
+        """Test a malformed MessagePack body is a 400."""
+        res = self.client.generic(
+            "POST",
+            reverse("recipe:recipe-list"),
+            b"\xc1",
+            content_type=MSGPACK,
+            HTTP_ACCEPT=MSGPACK,
+        )
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("MessagePack parse error", msgpack.unpackb(res.content)["detail"])
+
+    def test_renderer_types(self):
+        """Test types without a MessagePack encoding are written like JSON."""
+        data = {"price": Decimal("5.99"), "when": datetime.date(2024, 1, 2), "id": uuid.UUID(int=1)}
+        body = MessagePackRenderer().render(data)
+
+        self.assertEqual(
+            MessagePackParser().parse(BytesIO(body)),
+            json.loads(JSONRenderer().render(data)),
+        )
@@ -0,0 +1,145 @@
+"""
+Tests for the read replica router.
+"""
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+@override_settings(DATABASE_REPLICAS={"default": ["replica_0"]})
+class ReplicaRouterTests(TestCase):
+    """Test routing of reads to replicas."""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_use_primary_outside_replica_views(self):
+        """Test reads go to the primary by default."""
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_reads_use_replica_in_replica_views(self):
+        """Test reads go to a replica when enabled for the request."""
+        token = routers._read_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), "replica_0")
+        finally:
+            routers._read_replica.reset(token)
+
+    def test_writes_use_primary(self):
+        """Test writes always go to the primary."""
+        token = routers._read_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), "default")
+        finally:
+            routers._read_replica.reset(token)
+
+    def test_no_migrations_on_replicas(self):
+        """Test replicas are never migrated."""
+        self.assertFalse(self.router.allow_migrate("replica_0", "core"))
+        self.assertIsNone(self.router.allow_migrate("default", "core"))
+
+
+@override_settings(DATABASE_REPLICAS={"default": ["replica_0"]})
+@patch("core.routers.choose_replica", return_value="default")
+class ReplicaReadMixinTests(TestCase):
+    """Test replica selection in the recipe views."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_recipe(self):
+        payload = {"title": "Soup", "time_minutes": 5, "price": Decimal("1.50")}
+        return self.client.post(RECIPES_URL, payload)
+
+    def test_list_reads_from_replica(self, patched_choose):
+        """Test list requests read from a replica."""
+        Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+
+        self.client.get(RECIPES_URL)
+
+        patched_choose.assert_called()
+
+    def test_write_pins_user_to_primary(self, patched_choose):
+        """Test reads right after a write go to the primary."""
+        res = self._create_recipe()
+        self.assertIn(routers.PIN_COOKIE, res.cookies)
+
+        self.client.get(RECIPES_URL)
+
+        patched_choose.assert_not_called()
+
+    @override_settings(DB_REPLICA_PIN_CACHE=True)
+    def test_pin_without_cookie_uses_cache(self, patched_choose):
+        """Test the pin also applies to clients that drop cookies when enabled."""
+        self._create_recipe()
+        self.client.cookies.clear()
+
+        self.client.get(RECIPES_URL)
+
+        patched_choose.assert_not_called()
+
+    def test_pin_cache_off_by_default(self, patched_choose):
+        """Test pins are not stored or looked up in the cache by default."""
+        self._create_recipe()
+        self.client.cookies.clear()
+
+        with patch("core.routers.cache") as patched_cache:
+            self.client.get(RECIPES_URL)
+
+        patched_choose.assert_called()
+        patched_cache.get.assert_not_called()
+        self.assertIsNone(cache.get(routers._pin_cache_key(self.user)))
+
+    @override_settings(DATABASE_REPLICAS={"default": []})
+    def test_no_pins_without_replicas(self, patched_choose):
+        """Test writes do not pin, and reads do not look up pins, without replicas."""
+        res = self._create_recipe()
+
+        self.assertNotIn(routers.PIN_COOKIE, res.cookies)
+        self.assertIsNone(cache.get(routers._pin_cache_key(self.user)))
+
+
+@skipUnless("replica_0" in settings.DATABASES, "Set DB_REPLICA_HOSTS to test replicas.")
+class ReplicaDatabaseTests(TestCase):
+    """Test routing against a configured replica database."""
+
+    databases = {"default", *settings.DATABASE_REPLICAS["default"][:1]}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries_run_on_replica(self):
+        """Test list queries are executed on the replica connection."""
+        with CaptureQueriesContext(connections["replica_0"]) as replica_queries:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(
+            any("core_recipe" in query["sql"] for query in replica_queries.captured_queries)
+        )
@@ -0,0 +1,94 @@
+"""
+Tests for serving the OpenAPI schema.
+"""
+import gzip
+import tempfile
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework.test import APIClient
+
+from core.schema import CachedSpectacularAPIView
+
+SCHEMA_URL = reverse("api-schema")
+CHECKED_IN_SCHEMA = Path(settings.BASE_DIR) / "schema.yml"
+
+
+class CachedSchemaViewTests(TestCase):
+    """Test the cached schema view."""
+
+    def setUp(self):
+        CachedSpectacularAPIView._schemas.clear()
+        CachedSpectacularAPIView._rendered.clear()
+        self.client = APIClient()
+
+    def test_schema_cached_with_etag(self):
+        """Test the schema is generated once and revalidated with its ETag."""
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("paths", yaml.safe_load(res.content))
+        etag = res["ETag"]
+        with self.assertNumQueries(0):
+            cached = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(len(CachedSpectacularAPIView._schemas), 1)
+
+    def test_gzip_and_formats(self):
+        """Test gzip encoding and a separately cached JSON rendering."""
+        yaml_res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip")
+        json_res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(yaml_res["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", yaml_res["Vary"])
+        schema = yaml.safe_load(gzip.decompress(yaml_res.content))
+        self.assertEqual(json_res.json(), schema)
+        self.assertNotEqual(yaml_res["ETag"].removeprefix("W/"), json_res["ETag"])
+
+    def test_gzip_refused(self):
+        """Test a client refusing gzip with q=0 gets the schema uncompressed."""
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip;q=0")
+
+        self.assertNotIn("Content-Encoding", res)
+        self.assertIn("paths", yaml.safe_load(res.content))
+
+    def test_weak_etag_revalidated(self):
+        """Test the weak ETag of a compressed response still gets a 304."""
+        etag = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertTrue(etag.startswith("W/"))
+        self.assertEqual(res.status_code, 304)
+
+    def test_schema_file(self):
+        """Test a pre-generated schema file is served instead of generating one."""
+        with tempfile.NamedTemporaryFile("w", suffix=".yml") as f:
+            yaml.safe_dump({"openapi": "3.0.3", "paths": {}}, f)
+            f.flush()
+            with override_settings(OPENAPI_SCHEMA_FILE=f.name):
+                res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(yaml.safe_load(res.content), {"openapi": "3.0.3", "paths": {}})
+
+
+class CheckedInSchemaTests(TestCase):
+    """Test the checked-in schema.yml matches the code."""
+
+    def test_schema_up_to_date(self):
+        """Test schema.yml is what "manage.py spectacular" generates now."""
+        live = SchemaGenerator().get_schema(request=None, public=True)
+        live = yaml.safe_load(yaml.safe_dump(live))
+
+        with CHECKED_IN_SCHEMA.open() as f:
+            checked_in = yaml.safe_load(f)
+
+        self.assertEqual(
+            checked_in,
+            live,
+            "schema.yml is stale, run: python manage.py spectacular --file schema.yml",
+        )
@@ -0,0 +1,66 @@
+"""
+Tests for the synthetic data generator.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from benchmarks import dataset
+from core.models import Recipe, User
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command."""
+
+    def seed(self, **options):
+        """Run seed_data on a small data set and return the recipe values."""
+        call_command(
+            "seed_data",
+            users=5,
+            recipes_per_user=4,
+            image_ratio=0,
+            batch_users=2,
+            stdout=StringIO(),
+            **options,
+        )
+        return list(Recipe.objects.order_by("id").values_list("title", "time_minutes", "price"))
+
+    def test_generates_linked_data(self):
+        """Test users get recipes linked to their own tags and ingredients."""
+        self.seed()
+
+        self.assertEqual(User.objects.count(), 5)
+        self.assertTrue(Recipe.objects.exists())
+        for recipe in Recipe.objects.prefetch_related("tags", "ingredients"):
+            self.assertTrue(recipe.tags.all())
+            self.assertTrue(recipe.ingredients.all())
+            self.assertEqual({tag.user_id for tag in recipe.tags.all()}, {recipe.user_id})
+        user = User.objects.get(email="seed0-user0@example.com")
+        self.assertTrue(user.check_password("seed-pass-123"))
+
+    def test_deterministic(self):
+        """Test the same seed generates the same data, with either loader."""
+        first = self.seed(method="copy")
+        User.objects.all().delete()
+        second = self.seed(method="bulk")
+
+        self.assertEqual(first, second)
+
+    def test_existing_seed_rejected(self):
+        """Test running a seed twice is an error."""
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_placeholder_images(self):
+        """Test recipes can share a placeholder image."""
+        storage = Recipe._meta.get_field("image").storage
+        self.addCleanup(storage.delete, dataset.PLACEHOLDER_IMAGE)
+
+        call_command("seed_data", users=2, recipes_per_user=10, image_ratio=1, stdout=StringIO())
+
+        images = set(Recipe.objects.values_list("image", flat=True))
+        self.assertEqual(images, {dataset.PLACEHOLDER_IMAGE})
@@ -0,0 +1,165 @@
+"""
+Tests for user-based sharding.
+"""
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.utils import ConnectionDoesNotExist
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import routers, sharding
+from core.models import Recipe, Tag, UserShard
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def create_user(email="user@example.com", password="test123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@override_settings(DATABASE_SHARDS=["default", "shard_1"], SHARD_DIRECTORY_CACHE_SECONDS=0)
+class ShardDirectoryTests(TestCase):
+    """Test mapping users to shards."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+
+    def test_user_assignment_is_stored(self):
+        """Test a user's first shard is recorded and kept."""
+        shard = sharding.shard_for_user(self.user.pk)
+
+        self.assertEqual(shard, ["default", "shard_1"][self.user.pk % 2])
+        self.assertEqual(UserShard.objects.get(user=self.user).shard, shard)
+        with override_settings(DATABASE_SHARDS=["default", "shard_1", "shard_2"]):
+            self.assertEqual(sharding.shard_for_user(self.user.pk), shard)
+
+    def test_user_without_entry_stays_on_default(self):
+        """Test users predating the directory are not rehashed onto other shards."""
+        user = create_user(email="odd@example.com")
+        if user.pk % 2 == 0:
+            user = create_user(email="odd2@example.com")
+        UserShard.objects.filter(user=user).delete()
+
+        self.assertEqual(sharding.shard_for_user(user.pk), "default")
+
+    @override_settings(DATABASE_SHARDS=["default"])
+    def test_assignment_recorded_with_single_shard(self):
+        """Test new users get an entry before any shards are added."""
+        user = create_user(email="new@example.com")
+
+        self.assertEqual(UserShard.objects.get(user=user).shard, "default")
+
+    def test_backfill_migration(self):
+        """Test the migration records "default" for users without an entry."""
+        UserShard.objects.filter(user=self.user).delete()
+        migration = import_module("core.migrations.0008_backfill_user_shards")
+
+        migration.backfill_user_shards(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(UserShard.objects.get(user=self.user).shard, "default")
+
+    def test_write_during_move_rejected(self):
+        """Test writes are refused while the user is being moved."""
+        UserShard.objects.filter(user=self.user).update(shard="default", moving=True)
+
+        self.assertEqual(sharding.shard_for_user(self.user.pk), "default")
+        with self.assertRaises(sharding.ShardMoving):
+            sharding.shard_for_user(self.user.pk, for_write=True)
+
+    def test_router_uses_instance_shard(self):
+        """Test related rows follow the database of their instance."""
+        router = routers.ShardRouter()
+        recipe = Recipe(user=self.user)
+        recipe._state.db = "shard_1"
+
+        self.assertEqual(router.db_for_write(Recipe.tags.through, instance=recipe), "shard_1")
+        self.assertIsNone(router.db_for_read(get_user_model(), instance=recipe))
+
+    def test_router_uses_user_hint(self):
+        """Test new rows for a user go to the user's shard."""
+        UserShard.objects.filter(user=self.user).update(shard="shard_1")
+
+        router = routers.ShardRouter()
+
+        self.assertEqual(router.db_for_write(Tag, instance=self.user), "shard_1")
+
+
+@skipUnless("shard_1" in settings.DATABASES, "Set DB_SHARD_HOSTS to test shards.")
+@override_settings(SHARD_DIRECTORY_CACHE_SECONDS=0)
+class ShardMoveTests(TestCase):
+    """Test moving users between real shard databases."""
+
+    databases = {"default", *settings.DATABASE_SHARDS[1:2]}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        UserShard.objects.filter(user=self.user).update(shard="default")
+        self.client.force_authenticate(self.user)
+
+    def test_move_user_keeps_ids(self):
+        """Test a moved user's data is served from the new shard."""
+        payload = {
+            "title": "Soup",
+            "time_minutes": 5,
+            "price": Decimal("1.50"),
+            "tags": [{"name": "Dinner"}],
+        }
+        recipe_id = self.client.post(RECIPES_URL, payload, format="json").data["id"]
+
+        call_command("move_user_shard", self.user.pk, "shard_1", grace=0, stdout=StringIO())
+
+        self.assertFalse(Recipe.objects.using("default").filter(id=recipe_id).exists())
+        recipe = Recipe.objects.using("shard_1").get(id=recipe_id)
+        self.assertEqual([tag.name for tag in recipe.tags.all()], ["Dinner"])
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in res.data], [recipe_id])
+
+
+@skipUnless("shard_1" in settings.DATABASES, "Set DB_SHARD_HOSTS to test shards.")
+@override_settings(DATABASE_SHARDS=["default", "shard_1"])
+class IdSequenceTests(TestCase):
+    """Test interleaving the ID sequences of the shards."""
+
+    databases = {"default", *settings.DATABASE_SHARDS[1:2]}
+
+    def test_resequenced_when_shard_count_changes(self):
+        """Test every shard is re-sequenced, not only the migrated one."""
+        for alias in ("default", "shard_1"):
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT pg_get_serial_sequence('core_tag', 'id')")
+                cursor.execute(f"ALTER SEQUENCE {cursor.fetchone()[0]} INCREMENT BY 3")
+        user = create_user()
+
+        self.assertTrue(sharding.configure_id_sequences())
+        self.assertTrue(sharding.id_sequences_configured())
+        self.assertFalse(sharding.configure_id_sequences())
+        ids = [
+            Tag.objects.using(alias).create(user=user, name="Dinner").id
+            for alias in ("default", "shard_1", "default", "shard_1")
+        ]
+        self.assertEqual([tag_id % 2 for tag_id in ids], [1, 0, 1, 0])
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_unreachable_shard_raises(self):
+        """Test a shard that cannot be read is an error, not skipped."""
+        with override_settings(DATABASE_SHARDS=["default", "shard_1", "shard_9"]):
+            with self.assertRaises(ConnectionDoesNotExist):
+                sharding.configure_id_sequences()
@@ -0,0 +1,107 @@
+"""
+Tests for the slow-query log.
+"""
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import slow_queries
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class TokenBucketTests(SimpleTestCase):
+    """Test the rate limiter."""
+
+    def test_bucket_refills_over_time(self):
+        """Test tokens run out and come back at the configured rate."""
+        bucket = slow_queries.TokenBucket(rate=1, capacity=2)
+
+        with mock.patch("core.slow_queries.time.monotonic", return_value=bucket.updated):
+            self.assertTrue(bucket.consume())
+            self.assertTrue(bucket.consume())
+            self.assertFalse(bucket.consume())
+        with mock.patch("core.slow_queries.time.monotonic", return_value=bucket.updated + 1):
+            self.assertTrue(bucket.consume())
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.0001, SLOW_QUERY_MAX_PER_MINUTE=30)
+class SlowQueryLogTests(TestCase):
+    """Test logging slow queries."""
+
+    def setUp(self):
+        slow_queries._bucket = None
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="pass123",
+        )
+
+    def test_slow_select_logged_with_plan(self):
+        """Test a slow SELECT is logged with its plan."""
+        with connection.execute_wrapper(slow_queries.log_slow_query):
+            with self.assertLogs("core.slow_queries", level="WARNING") as logs:
+                list(Recipe.objects.filter(user=self.user, title__icontains="soup"))
+
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertIn('FROM "core_recipe"', entry["sql"])
+        self.assertIn("Node Type", entry["plan"][0]["Plan"])
+
+    def test_rate_limited(self):
+        """Test no more than the allowed number of queries is logged."""
+        with override_settings(SLOW_QUERY_MAX_PER_MINUTE=1):
+            with connection.execute_wrapper(slow_queries.log_slow_query):
+                with self.assertLogs("core.slow_queries", level="WARNING") as logs:
+                    list(Recipe.objects.all())
+                    list(Recipe.objects.all())
+
+        self.assertEqual(len(logs.records), 1)
+
+    def test_attributed_to_view(self):
+        """Test queries run by a view are tagged with the view and action."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with connection.execute_wrapper(slow_queries.log_slow_query):
+            with self.assertLogs("core.slow_queries", level="WARNING") as logs:
+                client.get(RECIPES_URL)
+
+        views = {json.loads(record.getMessage())["view"] for record in logs.records}
+        self.assertEqual(views, {"RecipeViewSet.list"})
+
+
+@override_settings(
+    SLOW_QUERY_THRESHOLD_MS=0.0001,
+    SLOW_QUERY_MAX_PER_MINUTE=30,
+    REQUEST_TIMING=True,
+)
+class SlowQueryMiddlewareTests(TransactionTestCase):
+    """Test the middleware wrapping connections per request."""
+
+    def setUp(self):
+        slow_queries._bucket = None
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com",
+            password="pass123",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_wrappers_removed_across_reconnects(self):
+        """Test the wrappers of nested middleware unwind when connections are reopened."""
+        with self.assertLogs("core.slow_queries", level="WARNING"):
+            self.client.get(RECIPES_URL)
+        connection.close()
+
+        with self.assertLogs("core.slow_queries", level="WARNING") as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(connection.execute_wrappers, [])
+        views = {json.loads(record.getMessage())["view"] for record in logs.records}
+        self.assertEqual(views, {"RecipeViewSet.list"})
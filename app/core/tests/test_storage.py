@@ -0,0 +1,71 @@
+"""
+Tests for the compressed, hashed static files storage.
+"""
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+from core import storage
+
+CSS = "body { color: #333; }\n" * 50
+
+
+class CompressedManifestStorageTests(SimpleTestCase):
+    """Test collectstatic with CompressedManifestStaticFilesStorage."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        source = os.path.join(self.tmp.name, "source")
+        os.mkdir(source)
+        with open(os.path.join(source, "app.css"), "w") as f:
+            f.write(CSS)
+        with open(os.path.join(source, "tiny.css"), "w") as f:
+            f.write("a {}")
+        self.root = os.path.join(self.tmp.name, "static")
+        settings = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STATICFILES_STORAGE="core.storage.CompressedManifestStaticFilesStorage",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def collect(self):
+        """Run collectstatic and return the manifest's paths."""
+        call_command("collectstatic", interactive=False, verbosity=0, stdout=StringIO())
+        with open(os.path.join(self.root, "staticfiles.json")) as f:
+            return json.load(f)["paths"]
+
+    def test_hashed_and_compressed(self):
+        """Test files are hashed and get compressed siblings."""
+        hashed = os.path.join(self.root, self.collect()["app.css"])
+
+        self.assertRegex(hashed, r"app\.[0-9a-f]{12}\.css$")
+        with gzip.open(hashed + ".gz", "rt") as f:
+            self.assertEqual(f.read(), CSS)
+        if storage.brotli is not None:
+            with open(hashed + ".br", "rb") as f:
+                self.assertEqual(storage.brotli.decompress(f.read()).decode(), CSS)
+
+    def test_small_files_not_compressed(self):
+        """Test files too small to gain from compression are left alone."""
+        hashed = os.path.join(self.root, self.collect()["tiny.css"])
+
+        self.assertTrue(os.path.exists(hashed))
+        self.assertFalse(os.path.exists(hashed + ".gz"))
+
+    def test_templates_resolve_hashed_names(self):
+        """Test static URLs use the manifest, and plain names without one."""
+        self.assertEqual(static("app.css"), "/static/static/app.css")
+
+        hashed = self.collect()["app.css"]
+        with override_settings(STATIC_ROOT=self.root):
+            self.assertEqual(static("app.css"), f"/static/static/{hashed}")
@@ -0,0 +1,57 @@
+"""
+Tests for worker warmup.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# Loads the WSGI application like a uWSGI worker and times the first two requests.
+SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app.wsgi import application
+startup = time.perf_counter() - start
+from benchmarks.loadtest import build_environ
+
+timings = []
+for _ in range(2):
+    start = time.perf_counter()
+    response = application(
+        build_environ("localhost", "GET", "/api/recipe/recipes/"),
+        lambda status, headers, exc_info=None: None,
+    )
+    b"".join(response)
+    response.close()
+    timings.append(time.perf_counter() - start)
+print(json.dumps({"startup": startup, "first": timings[0], "second": timings[1]}))
+"""
+
+
+def run_worker(preload):
+    """Start the application in a new interpreter and return its timings."""
+    env = {**os.environ, "WARMUP_PRELOAD": str(int(preload)), "DEBUG": "1"}
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class WarmupTests(SimpleTestCase):
+    """Test startup and first-request latency with and without warmup."""
+
+    def test_first_request_latency(self):
+        """Test warmup moves first-request costs to startup."""
+        cold = run_worker(preload=False)
+        warm = run_worker(preload=True)
+
+        timings = f"cold: {cold}, warm: {warm}"
+        self.assertLess(warm["first"], cold["first"], timings)
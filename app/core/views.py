@@ -1,14 +1,75 @@
 """
 Core views for app.
 """
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
+import hmac
 
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_safe
 
-@api_view(["GET"])
+from core import health
+from core import metrics as core_metrics
+from core.models import Recipe
+
+
+@require_safe
 def health_check(request):
-    """Returns successful response."""
-    return Response({"healthy": True})
+    """Liveness probe: answers as long as the process serves requests."""
+    return JsonResponse({"healthy": True})
+
+
+@require_safe
+def readiness_check(request):
+    """Readiness probe: the last dependency report, 503 when unavailable."""
+    report = health.checker.report()
+    return JsonResponse(report, status=503 if report["status"] == "unavailable" else 200)
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Expose metrics aggregated over all worker processes to Prometheus."""
+    if not settings.METRICS_DIR:
+        raise Http404("Metrics are disabled.")
+    # Behind a load balancer or Docker's userland proxy public requests come
+    # from private addresses too, so the token is required, not optional.
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    authorization = request.headers.get("Authorization", "")
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(authorization, expected):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        core_metrics.generate_latest(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def storage_upload(request, token):
+    """Accept a pre-signed upload for the local object storage emulator."""
+    storage = Recipe._meta.get_field("image").storage
+    try:
+        upload = storage.load_upload_token(token)
+    except signing.BadSignature:
+        return HttpResponse("Invalid or expired upload URL.", status=403)
+
+    if request.content_type != upload["content_type"]:
+        return HttpResponse("Content-Type does not match upload URL.", status=400)
+    try:
+        size = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        size = 0
+    if not size:
+        return HttpResponse("Content-Length required.", status=411)
+    if size > settings.RECIPE_IMAGE_MAX_SIZE:
+        return HttpResponse("Upload too large.", status=413)
+    if storage.exists(upload["name"]):
+        return HttpResponse("Object already uploaded.", status=409)
+
+    storage.save(upload["name"], File(request, name=upload["name"]))
+    return HttpResponse(status=201)
 
 
 """
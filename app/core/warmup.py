@@ -0,0 +1,87 @@
+"""
+Worker warmup for pre-forking servers.
+
+preload() runs once in the uWSGI master before workers are forked, so the
+work is shared copy-on-write. warm_worker() runs in every worker after the
+fork for what cannot be shared, such as database connections.
+"""
+import gc
+import importlib
+import logging
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger("core.warmup")
+
+PRELOAD_MODULES = (
+    "rest_framework.authentication",
+    "rest_framework.authtoken.models",
+    "rest_framework.renderers",
+    "rest_framework.parsers",
+    "rest_framework.negotiation",
+    "recipe.views",
+    "recipe.serializers",
+    "user.views",
+    "user.serializers",
+)
+
+
+def _serializer_classes():
+    from recipe import serializers as recipe_serializers
+    from user import serializers as user_serializers
+
+    return [
+        recipe_serializers.RecipeSerializer,
+        recipe_serializers.RecipeDetailSerializer,
+        recipe_serializers.TagSerializer,
+        recipe_serializers.IngredientSerializer,
+        recipe_serializers.RecipeImageSerializer,
+        user_serializers.UserSerializer,
+        user_serializers.AuthTokenSerializer,
+    ]
+
+
+def preload():
+    """Import request-path modules and compile URL patterns, then freeze the heap."""
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+    # Populates the resolver's reverse dictionaries and compiles every pattern.
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for namespace in resolver.namespace_dict:
+        resolver.namespace_dict[namespace][1].reverse_dict
+
+    for serializer_class in _serializer_classes():
+        serializer_class().fields
+
+    # Connections must not be shared with the forked workers.
+    connections.close_all()
+    gc.collect()
+    # Keep the preloaded objects out of future collections, so the collector
+    # does not touch (and copy) the pages shared with the master.
+    gc.freeze()
+
+
+def warm_worker():
+    """Open database connections and run a serializer pass in a fresh worker."""
+    for alias in {"default", *settings.DATABASE_SHARDS}:
+        try:
+            connections[alias].ensure_connection()
+        except Exception:
+            logger.warning("Warmup could not connect to database %s.", alias, exc_info=True)
+
+    from recipe.serializers import RecipeDetailSerializer
+
+    serializer = RecipeDetailSerializer(
+        data={
+            "title": "Warmup",
+            "time_minutes": 1,
+            "price": "1.00",
+            "tags": [{"name": "warmup"}],
+            "ingredients": [{"name": "warmup"}],
+        }
+    )
+    serializer.is_valid()
@@ -1,12 +1,29 @@
 """
 Serializers for recipe APIs
 """
+from django.db import models
+from django.urls import reverse
+
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from core.instrumentation import TimedSerializerMixin
 from core.models import Recipe, Tag, Ingredient
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class ProtectedImageField(serializers.ImageField):
+    """Image field that links to the authenticated recipe image endpoint."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = reverse("recipe:recipe-image", args=[value.instance.pk])
+        request = self.context.get("request", None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -15,7 +32,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -58,9 +75,14 @@ description	string
 """
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
 
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: ProtectedImageField,
+    }
+
     tags = TagSerializer(many=True, required=False)
     """
     tags：這是一個多對多字段，它使用 TagSerializer 來序列化標籤。
@@ -208,9 +230,11 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ["description", "image"]
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
 
+    serializer_field_mapping = RecipeSerializer.serializer_field_mapping
+
     class Meta:
         model = Recipe
         fields = ["id", "image"]
@@ -221,3 +245,31 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         序列化器層面（required=True）：在提交數據進行驗證時，
         該字段必須被提供。
         """
+
+
+# Content types accepted for direct uploads, with the extension and Pillow
+# format of each.
+DIRECT_UPLOAD_TYPES = {
+    "image/jpeg": (".jpg", "JPEG"),
+    "image/png": (".png", "PNG"),
+    "image/gif": (".gif", "GIF"),
+    "image/webp": (".webp", "WEBP"),
+}
+
+
+class RecipeImageUploadSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Serializer for requesting a direct image upload URL."""
+
+    filename = serializers.CharField(max_length=255, write_only=True)
+    content_type = serializers.ChoiceField(choices=list(DIRECT_UPLOAD_TYPES))
+    url = serializers.CharField(read_only=True)
+    method = serializers.CharField(read_only=True)
+    headers = serializers.DictField(child=serializers.CharField(), read_only=True)
+    upload_token = serializers.CharField(read_only=True)
+    expires_in = serializers.IntegerField(read_only=True)
+
+
+class RecipeImageFinalizeSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Serializer for linking a directly uploaded image to a recipe."""
+
+    upload_token = serializers.CharField()
@@ -7,7 +7,8 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core import signing
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
@@ -34,6 +35,21 @@ def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
+def image_url(recipe_id):
+    """Create and return a recipe image URL."""
+    return reverse("recipe:recipe-image", args=[recipe_id])
+
+
+def image_upload_url_url(recipe_id):
+    """Create and return a direct image upload URL endpoint."""
+    return reverse("recipe:recipe-image-upload-url", args=[recipe_id])
+
+
+def finalize_image_url(recipe_id):
+    """Create and return an image finalize URL."""
+    return reverse("recipe:recipe-finalize-image", args=[recipe_id])
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
     defaults = {
@@ -504,3 +520,192 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format="multipart")
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _upload_image(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            img = Image.new("RGB", (10, 10))
+            img.save(image_file, format="JPEG")
+            image_file.seek(0)
+            return self.client.post(url, {"image": image_file}, format="multipart")
+
+    def test_uploaded_image_links_to_protected_endpoint(self):
+        """Test image URLs point at the authenticated image endpoint."""
+        res = self._upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["image"].endswith(image_url(self.recipe.id)))
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True, MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_retrieve_image_accel_redirect(self):
+        """Test the image is handed to nginx without reading the file."""
+        self._upload_image()
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(image_url(self.recipe.id), HTTP_ACCEPT="image/jpeg")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res["X-Accel-Redirect"], "/protected-media/" + self.recipe.image.name
+        )
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["X-Content-Type-Options"], "nosniff")
+        self.assertIn("private", res["Cache-Control"])
+        self.assertEqual(res.content, b"")
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=False)
+    def test_retrieve_image_without_proxy(self):
+        """Test the image is streamed by Django when nginx is not in front."""
+        self._upload_image()
+
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Accel-Redirect", res)
+        self.assertTrue(b"".join(res.streaming_content))
+
+    def test_retrieve_image_other_user_not_found(self):
+        """Test users cannot fetch images of other users' recipes."""
+        self._upload_image()
+        other_user = create_user(email="other@example.com", password="test123")
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_image_missing(self):
+        """Test 404 when the recipe has no image."""
+        res = self.client.get(image_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DirectImageUploadTests(TestCase):
+    """Tests for uploading images directly to storage."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def _image_bytes(self):
+        with tempfile.TemporaryFile() as image_file:
+            Image.new("RGB", (10, 10)).save(image_file, format="JPEG")
+            image_file.seek(0)
+            return image_file.read()
+
+    def _request_upload(self):
+        payload = {"filename": "photo.jpg", "content_type": "image/jpeg"}
+        return self.client.post(image_upload_url_url(self.recipe.id), payload)
+
+    def _put(self, upload, data, content_type="image/jpeg"):
+        return self.client.generic("PUT", upload["url"], data, content_type=content_type)
+
+    def test_direct_upload_and_finalize(self):
+        """Test uploading to the signed URL and linking it to the recipe."""
+        upload = self._request_upload().data
+        self.assertEqual(upload["method"], "PUT")
+
+        res = self._put(upload, self._image_bytes())
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(
+            finalize_image_url(self.recipe.id),
+            {"upload_token": upload["upload_token"]},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith(".jpg"))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_upload_bad_signature_rejected(self):
+        """Test uploads with a tampered URL are rejected."""
+        upload = self._request_upload().data
+        upload["url"] = upload["url"].replace("/upload/", "/upload/x")
+
+        res = self._put(upload, self._image_bytes())
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_upload_content_type_mismatch(self):
+        """Test the upload must use the content type it was signed for."""
+        upload = self._request_upload().data
+
+        res = self._put(upload, b"data", content_type="text/plain")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_without_upload(self):
+        """Test finalizing fails until the object exists."""
+        upload = self._request_upload().data
+
+        res = self.client.post(
+            finalize_image_url(self.recipe.id),
+            {"upload_token": upload["upload_token"]},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_token_for_other_recipe(self):
+        """Test an upload token cannot be used on another recipe."""
+        upload = self._request_upload().data
+        self._put(upload, self._image_bytes())
+        other_recipe = create_recipe(user=self.user)
+
+        res = self.client.post(
+            finalize_image_url(other_recipe.id),
+            {"upload_token": upload["upload_token"]},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        Recipe._meta.get_field("image").storage.delete(
+            signing.loads(upload["upload_token"], salt="recipe.finalize_image")["key"]
+        )
+
+    def test_extension_from_content_type(self):
+        """Test the stored name ignores the extension of the client's filename."""
+        payload = {"filename": "x.html", "content_type": "image/jpeg"}
+        upload = self.client.post(image_upload_url_url(self.recipe.id), payload).data
+
+        key = signing.loads(upload["upload_token"], salt="recipe.finalize_image")["key"]
+
+        self.assertTrue(key.endswith(".jpg"))
+
+    def test_finalize_rejects_non_image(self):
+        """Test uploads that are not valid images are deleted, not linked."""
+        storage = Recipe._meta.get_field("image").storage
+        upload = self._request_upload().data
+        self._put(upload, b"<html><script>alert(1)</script></html>")
+        key = signing.loads(upload["upload_token"], salt="recipe.finalize_image")["key"]
+
+        res = self.client.post(
+            finalize_image_url(self.recipe.id),
+            {"upload_token": upload["upload_token"]},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(storage.exists(key))
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_finalize_rejects_other_format(self):
+        """Test the image must be in the format of the content type it was signed for."""
+        upload = self._request_upload().data
+        with tempfile.TemporaryFile() as image_file:
+            Image.new("RGB", (10, 10)).save(image_file, format="PNG")
+            image_file.seek(0)
+            self._put(upload, image_file.read())
+
+        res = self.client.post(
+            finalize_image_url(self.recipe.id),
+            {"upload_token": upload["upload_token"]},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,6 +1,13 @@
 """
 Views for the recipe APIs
 """
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse
+from PIL import Image
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -9,13 +16,23 @@ from drf_spectacular.utils import (
 )
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, recipe_image_file_path
+from core.routers import ReplicaReadMixin, ShardRoutingMixin
 from recipe import serializers
 
+
+class MediaContentNegotiation(DefaultContentNegotiation):
+    """Skip Accept matching for endpoints that return raw files."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
 """
 @extend_schema_view: 這是一個修飾器，用於擴展視圖中的某些操作的模式。
 
@@ -47,7 +64,7 @@ description: 這是參數的描述。
         ]
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ShardRoutingMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """View for manage recipe APIs."""
 
     serializer_class = serializers.RecipeDetailSerializer
@@ -88,7 +105,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
 
-        return queryset.filter(user=self.request.user).order_by("-id").distinct()
+        queryset = queryset.filter(user=self.request.user).order_by("-id").distinct()
+        if self.action == "list":
+            # Two queries for all tags and ingredients instead of two per recipe.
+            queryset = queryset.prefetch_related("tags", "ingredients")
+        return queryset
         # """Retrieve recipes for authenticated user."""
         # return self.queryset.filter(user=self.request.user).order_by("-id")
 
@@ -98,6 +119,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "image_upload_url":
+            return serializers.RecipeImageUploadSerializer
+        elif self.action == "finalize_image":
+            return serializers.RecipeImageFinalizeSerializer
 
         return self.serializer_class
 
@@ -136,6 +161,137 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=["POST"], detail=True, url_path="image-upload-url")
+    def image_upload_url(self, request, pk=None):
+        """Return a pre-signed URL for uploading an image directly to storage."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        storage = Recipe._meta.get_field("image").storage
+        content_type = serializer.validated_data["content_type"]
+        # The extension comes from the accepted content type, never from the
+        # client's filename, so the image is always served as an image.
+        extension, _ = serializers.DIRECT_UPLOAD_TYPES[content_type]
+        key = recipe_image_file_path(recipe, f"image{extension}")
+        expires_in = settings.RECIPE_IMAGE_UPLOAD_EXPIRY
+        upload = storage.generate_upload_url(key, content_type, expires_in)
+        upload_token = signing.dumps(
+            {"recipe": recipe.id, "key": key, "content_type": content_type},
+            salt="recipe.finalize_image",
+        )
+        return Response(
+            {
+                "url": request.build_absolute_uri(upload["url"]),
+                "method": upload["method"],
+                "headers": upload["headers"],
+                "content_type": serializer.validated_data["content_type"],
+                "upload_token": upload_token,
+                "expires_in": expires_in,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(responses=serializers.RecipeImageSerializer)
+    @action(methods=["POST"], detail=True, url_path="finalize-image")
+    def finalize_image(self, request, pk=None):
+        """Link an image uploaded through image-upload-url to the recipe."""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            upload = signing.loads(
+                serializer.validated_data["upload_token"],
+                salt="recipe.finalize_image",
+                max_age=settings.RECIPE_IMAGE_UPLOAD_EXPIRY * 2,
+            )
+        except signing.BadSignature:
+            upload = None
+        # Tokens signed before content types were recorded are refused.
+        if upload is None or upload["recipe"] != recipe.id or "content_type" not in upload:
+            return Response(
+                {"upload_token": ["Invalid or expired upload token."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        storage = Recipe._meta.get_field("image").storage
+        if not storage.exists(upload["key"]):
+            return Response(
+                {"upload_token": ["Image has not been uploaded."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if storage.size(upload["key"]) > settings.RECIPE_IMAGE_MAX_SIZE:
+            storage.delete(upload["key"])
+            return Response(
+                {"upload_token": ["Uploaded image is too large."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        _, image_format = serializers.DIRECT_UPLOAD_TYPES[upload["content_type"]]
+        if not self._is_valid_image(storage, upload["key"], image_format):
+            storage.delete(upload["key"])
+            return Response(
+                {
+                    "upload_token": [
+                        "Upload a valid image. The file you uploaded was either "
+                        "not an image or a corrupted image."
+                    ]
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        recipe.image.name = upload["key"]
+        recipe.save(update_fields=["image"])
+        data = serializers.RecipeImageSerializer(
+            recipe, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    def _is_valid_image(self, storage, key, image_format):
+        """Return whether key holds an intact image in image_format."""
+        try:
+            with storage.open(key, "rb") as image_file:
+                image = Image.open(image_file)
+                image.verify()
+        except Exception:
+            # Pillow raises many exception types for bad input, as
+            # Django's ImageField also assumes.
+            return False
+        return image.format == image_format
+
+    @extend_schema(responses={(200, "image/*"): OpenApiTypes.BINARY})
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="image",
+        url_name="image",
+        content_negotiation_class=MediaContentNegotiation,
+    )
+    def retrieve_image(self, request, pk=None):
+        """Serve the recipe image to its owner.
+
+        In production nginx streams the file from an internal location
+        (sendfile, range requests, ETag), so the worker never reads the image.
+        """
+        recipe = self.get_object()
+        if not recipe.image:
+            raise Http404("Recipe has no image.")
+
+        content_type, _ = mimetypes.guess_type(recipe.image.name)
+        content_type = content_type or "application/octet-stream"
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(
+                recipe.image.name
+            )
+        else:
+            response = FileResponse(recipe.image.open("rb"), content_type=content_type)
+
+        response["Cache-Control"] = f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+        response["Vary"] = "Authorization"
+        response["X-Content-Type-Options"] = "nosniff"
+        return response
+
     """
     create 方法處理 POST 請求的邏輯，它是用於創建資料的主要方法。
     這個方法首先會初始化序列化器，檢查序列化器是否有效，然後保存資料。
@@ -177,6 +333,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
 )
 class BaseRecipeAttrViewSet(
+    ShardRoutingMixin,
+    ReplicaReadMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
@@ -1,13 +1,56 @@
 server {
     listen ${LISTEN_PORT};
 
+    sendfile    on;
+    tcp_nopush  on;
+
+    # Recipe images are only reachable through the authenticated
+    # /api/recipe/recipes/<id>/image/ endpoint.
+    location /static/media {
+        return 404;
+    }
+
     location /static {
         alias /vol/static;
     }
 
+    # Collected static files. collectstatic writes .gz siblings for
+    # gzip_static; the .br ones need the ngx_brotli module to be served.
+    # Hashed names (name.<12 hex digits>.ext) never change content, so they
+    # are cached for good.
+    location /static/static/ {
+        root        /vol;
+        gzip_static on;
+        gzip_vary   on;
+
+        location ~ "\.[0-9a-f]{12}\.\w+$" {
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+    }
+
+    # Target of the X-Accel-Redirect header set by the app. nginx handles
+    # range requests, ETag and Last-Modified for these files itself.
+    location /protected-media/ {
+        internal;
+        alias /vol/static/media/;
+    }
+
+    # Metrics are for the Prometheus scraper on the internal network only.
+    # The app also requires METRICS_TOKEN, as the source address alone
+    # cannot tell internal clients apart behind a load balancer.
+    location = /api/metrics/ {
+        allow                   127.0.0.1;
+        allow                   10.0.0.0/8;
+        allow                   172.16.0.0/12;
+        allow                   192.168.0.0/16;
+        deny                    all;
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+    }
+
     location / {
         uwsgi_pass              ${APP_HOST}:${APP_PORT};
         include                 /etc/nginx/uwsgi_params;
         client_max_body_size    10M;
     }
-}
\ No newline at end of file
+}
@@ -2,8 +2,14 @@
 
 set -e
 
-python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
+# Start with empty metrics so samples of previous containers are not served.
+if [ -n "$METRICS_DIR" ]; then
+    rm -rf "$METRICS_DIR"
+    mkdir -p "$METRICS_DIR"
+fi
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# Waits for the databases, then collects static files, migrates and writes
+# OPENAPI_SCHEMA_FILE concurrently, skipping what is already up to date.
+python manage.py boot
+
+uwsgi --socket :9000 --workers 4 --threads ${UWSGI_THREADS:-1} --master --enable-threads --module app.wsgi
\ No newline at end of file